@@ -1,5 +1,6 @@
-from asyncio import CancelledError
+from asyncio import CancelledError, Lock, Semaphore
 from datetime import UTC, datetime, timedelta
+from functools import partial
 from random import choice, randint, random
 from typing import Any
 
@@ -12,25 +13,31 @@ from discord import (
     Member,
     Message,
     StickerItem,
+    TextChannel,
     User,
     app_commands,
 )
-from discord.abc import Messageable
+from discord.abc import GuildChannel, Messageable
 from discord.ext.commands import Cog
 from google.genai.errors import APIError
 from humanize import naturaldelta
 from odmantic import query
+from pymongo.errors import BulkWriteError
 
+from bot.history import ChannelHistory, ChannelMessage
 from bot.main import ActBot
 from bot.ui.embed import EmbedX
+from bot.ui.stream import StreamReply
 from db.actor import Actor, DmActor
+from db.chat import ChatSummary, ChatTurn
 from db.main import ActToml, DbRef
 from db.persona import Persona
-from utils.ai import ActAi
-from utils.file import ActFile
+from utils.ai import ActAi, PromptBlock, PromptCoalesced
+from utils.file import ActFile, ActFileCache
 from utils.log import logger
-from utils.misc import text_csv
-from utils.task import ActTaskManager, TaskRef
+from utils.cache import ActCache
+from utils.misc import text_csv_lines, text_csv_row
+from utils.task import ActTaskManager, ActTimingWheel
 
 log = logger(__name__)
 
@@ -41,10 +48,17 @@ log = logger(__name__)
 class AiCog(Cog, description="Integrated generative AI chat bot"):
     MAX_ACTORS = 10  # last interactors
     MAX_CHANNEL_HISTORY = 300  # last messages/participants
-
-    COOLDOWN_TIME = 60  # 1 min
+    MAX_CHANNEL_CONTEXT_CHARS = 16000  # channel messages prompt budget (~4k tokens)
+    MESSAGE_CSV_HEADER = "author_id,message_content,message_embed"
+    MAX_SESSION_HISTORY = 20  # last chat session contents kept in database
+    SUMMARY_KEPT_HISTORY = 8  # last chat session contents kept verbatim on summary
+    SESSION_EVICT_INTERVAL = 600  # 10 min
+    RESPONSE_CACHE_TTL = 300  # 5 min, duplicate prompts answered without model call
+
+    RATE_LIMIT_WARNING_TIME = 30  # 30 sec
     MAX_FILE_SIZE = 2097152  # 2 MB
     REPLY_DELAY_RANGE = (1, 5)  # 1 sec - 5 sec
+    STREAMING_ENABLED = True  # progressively edited replies
 
     AUTO_REPLY_ENABLED = True
     AUTO_REPLY_DELAY_RANGE = (5, 1800)  # 5 sec - 30 min
@@ -52,6 +66,9 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
 
     INITIATIVE_ENABLED = False
     INITIATIVE_DELAY_RANGE = (1800, 7200)  # 30 min - 2 hr
+    INITIATIVE_TICK = 60  # 1 min, due initiatives are spread over it
+    INITIATIVE_CONCURRENCY = 4  # initiatives performed at once across guilds
+    INITIATIVE_CHANNELS_TTL = 600  # 10 min, cached permitted channels per guild
 
     def __init__(self, bot: ActBot):
         self.bot = bot
@@ -59,16 +76,45 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
         self.ai = ActAi(
             api_key=bot.api_keys.get("gemini", " "),
             instructions=self.persona.description,
+            response_cache_ttl=self.RESPONSE_CACHE_TTL,
         )
         log.info(f"AI persona @{self.persona.name} used.")
         self.task_manager = ActTaskManager()
+        self.channel_history = ChannelHistory(self.MAX_CHANNEL_HISTORY)
+        self.file_cache = ActFileCache()
+        self.message_csv_rows: ActCache[int, str] = ActCache(16384)  # Message id -> row
+        self.recent_actors: ActCache[int, list[dict[str, Any]]] = ActCache(
+            1024, ttl=600
+        )  # Guild id -> last interactors, latest first
+        # Session id -> (saved contents count, last saved seq)
+        self.history_marks: dict[int, tuple[int, int]] = {}
+        self.history_locks: dict[int, Lock] = {}  # Session id -> lock of its saves
+        self.session_lock = Lock()  # Guards session restoration & eviction
+        self.initiative_wheel: ActTimingWheel[int] = ActTimingWheel(
+            self.INITIATIVE_TICK
+        )  # Guild ids
+        self.initiative_semaphore = Semaphore(self.INITIATIVE_CONCURRENCY)
+        self.initiative_channels: ActCache[int, list[int]] = ActCache(
+            4096, ttl=self.INITIATIVE_CHANNELS_TTL
+        )  # Guild id -> permitted channel ids
         if self.INITIATIVE_ENABLED:
             self.task_manager.schedule(
                 "initiative", lambda _: self.schedule_initiative()
             )
+        self.task_manager.schedule(
+            "evict_sessions",
+            lambda _: self.evict_sessions(),
+            delay=self.SESSION_EVICT_INTERVAL,
+            loop=True,
+        )
+
+    async def cog_load(self):
+        main_db = await self.bot.get_db()
+        await main_db.configure_database([ChatTurn, ChatSummary])
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.task_manager.cancel_all()
+        await ActFile.close_session()
 
     # ----------------------------------------------------------------------------------------------------
     # * Reset
@@ -85,14 +131,12 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             guild = interaction.guild
             user = interaction.user
             id = guild.id if guild else user.id
-        if self.ai.clear_session(id):
+        is_live_cleared = self.ai.clear_session(id)
+        is_saved_cleared = await self.clear_history(id)  # Even if not live (evicted)
+        if is_live_cleared or is_saved_cleared:
             await interaction.followup.send(
                 embed=EmbedX.success(f"AI chat session with ID `{id}` cleared.")
             )
-            if guild:
-                self.save_guild_history(guild)
-            elif isinstance(user, User):
-                self.save_dm_history(user)
         else:
             await interaction.followup.send(
                 embed=EmbedX.warning(f"No AI chat session with ID `{id}`.")
@@ -145,7 +189,7 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             replyable_message = await interaction.channel.fetch_message(message_id)
 
         # Prepare prompt
-        text_prompt, _ = await self.create_prompt(
+        prompt_blocks, _ = await self.create_prompt(
             message=replyable_message,
             user=member,
             channel=interaction.channel,
@@ -168,12 +212,11 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                     ),
                     ephemeral=True,
                 )
-                self.ai.use_session(
-                    interaction.guild.id,
-                    history=self.load_guild_history(interaction.guild),
-                )
+                await self.use_session(interaction.guild.id)
                 messagge_content = (
-                    await self.ai.prompt(text=text_prompt, file=file_prompt)
+                    await self.ai.prompt(
+                        interaction.guild.id, text=prompt_blocks, file=file_prompt
+                    )
                     or f"👋 {member.mention if member else "👋"}"
                 )
                 if replyable_message:
@@ -188,13 +231,17 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                 return
 
         # Save history
-        self.save_guild_history(interaction.guild)
+        await self.save_history(interaction.guild.id)
+        await self.summarize_history(interaction.guild.id)
 
     # ----------------------------------------------------------------------------------------------------
     # * On Message
     # ----------------------------------------------------------------------------------------------------
     @Cog.listener()
     async def on_message(self, message: Message):
+        # Remember message for channel history
+        self.channel_history.add(message)
+
         # Ignore bot message
         if self.bot.user == message.author:
             return
@@ -214,7 +261,7 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
         reply_delay = randint(self.REPLY_DELAY_RANGE[0], self.REPLY_DELAY_RANGE[1])
 
         # Create prompt
-        text_prompt, file_prompt = await self.create_prompt(
+        prompt_blocks, file_prompt = await self.create_prompt(
             message=message, preface=await self.create_prompt_reply_preface(message)
         )
 
@@ -224,10 +271,9 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             id = guild.id if guild else message.author.id
             user = message.author
 
-            # Check cooldown
-            cooldown_task_id = f"cooldown_{id}"
-            if self.task_manager.is_running(cooldown_task_id):
-                time_left = self.task_manager.time_left(cooldown_task_id) or 0
+            # Warn about long wait for model rate limit (Prompt stays queued)
+            time_left = self.ai.limiter.wait_time
+            if time_left > self.RATE_LIMIT_WARNING_TIME:
                 await message.reply(
                     choice(
                         self.persona.messages.get("cooldown_warning", ["⏳"])
@@ -235,27 +281,30 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                         time_left=naturaldelta(timedelta(seconds=time_left)) or "?"
                     )
                 )
-                return
+                log.loading(
+                    f"[{guild}] Waiting ~{naturaldelta(timedelta(seconds=time_left))} for AI rate limit "
+                    f"(queue: {self.ai.limiter.queue_depth})..."
+                )
 
             # Perform prompt & send reply
             async with message.channel.typing():
                 try:
-                    self.ai.use_session(
-                        id,
-                        history=(
-                            self.load_guild_history(guild)
-                            if guild
-                            else (
-                                self.load_dm_history(user)
-                                if isinstance(user, User)
-                                else []
-                            )
-                        ),
-                    )
-                    await message.reply(
-                        await self.ai.prompt(text_prompt, file_prompt)
+                    await self.use_session(id)
+                    stream_reply = StreamReply(message)
+                    await stream_reply.finish(
+                        await self.ai.prompt(
+                            id,
+                            prompt_blocks,
+                            file_prompt,
+                            coalesce=True,
+                            on_stream=(
+                                stream_reply.update if self.STREAMING_ENABLED else None
+                            ),
+                        )
                         or f"👋 {user.mention if user else "What? 😕"}"
                     )
+                except PromptCoalesced:
+                    return  # Answered by reply to a later message
                 except HTTPException as e:
                     if e.code == 50035:
                         await message.channel.send(
@@ -269,12 +318,6 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                     await message.reply(
                         choice(self.persona.messages.get("model_error", ["🔋"]))
                     )
-                    self.task_manager.schedule(
-                        cooldown_task_id, delay=self.COOLDOWN_TIME
-                    )
-                    log.loading(
-                        f"[{guild}] Waiting {naturaldelta(timedelta(seconds=self.COOLDOWN_TIME))} for cooldown..."
-                    )
                     log.exception(e)
                 except Exception as e:
                     await message.channel.send(
@@ -283,14 +326,12 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                     log.exception(e)
 
             # Remember chat session
-            if guild:
-                self.save_guild_history(guild)
-            elif isinstance(user, User):
-                self.save_dm_history(user)
+            await self.save_history(id)
+            await self.summarize_history(id)
 
-        # Run reply task
+        # Run reply task (Burst of prompts in same session get a single reply)
         self.task_manager.schedule(
-            id=f"reply_{message.guild.id if message.guild else message.author.id}",
+            id=f"reply_{message.id}",
             callback=respond,  # type: ignore
             delay=reply_delay,
         )
@@ -298,42 +339,67 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             f"[{message.guild}][{message.channel}] Reply in {naturaldelta(timedelta(seconds=reply_delay))}..."
         )
 
+    # ----------------------------------------------------------------------------------------------------
+    # * On Message Edit & Delete
+    # ----------------------------------------------------------------------------------------------------
+    @Cog.listener()
+    async def on_message_edit(self, message_before: Message, message_after: Message):
+        self.channel_history.edit(message_after)
+        self.message_csv_rows.pop(message_after.id)
+
+    @Cog.listener()
+    async def on_message_delete(self, message: Message):
+        self.channel_history.delete(message.channel.id, message.id)
+        self.message_csv_rows.pop(message.id)
+
     # ----------------------------------------------------------------------------------------------------
     # * Guild initiative
     # ----------------------------------------------------------------------------------------------------
     async def schedule_initiative(self):
-        """Schedule initiative task for each guild."""
+        """Schedule initiative of each guild, then tick initiative wheel."""
         await self.bot.wait_until_ready()
-
-        def random_delay():
-            min_delay, max_delay = self.INITIATIVE_DELAY_RANGE
-            delay = randint(min_delay, max_delay)
-            log.loading(
-                f"[{guild.name}] Waiting {naturaldelta(timedelta(seconds=delay))} for next initiative..."
-            )
-            return delay
-
         for guild in self.bot.guilds:
+            self.schedule_guild_initiative(guild)
+        self.task_manager.schedule(
+            "initiative_tick",
+            lambda _: self.tick_initiative(),
+            delay=self.INITIATIVE_TICK,
+            loop=True,
+        )
 
-            def create_callback(guild: Guild):
-                async def perform(task_ref: TaskRef):
-                    task_ref.delay = random_delay()
-                    try:
-                        await self.perform_initiative(guild)
-                    except CancelledError:
-                        log.warning(f"[{guild.name}] Initiative task was cancelled.")
-                    except Exception as e:
-                        log.error(f"[{guild.name}] Initiative task error: {str(e)}")
-
-                return perform
+    def schedule_guild_initiative(self, guild: Guild):
+        """Schedule next initiative of given guild after random delay."""
+        delay = randint(*self.INITIATIVE_DELAY_RANGE)
+        self.initiative_wheel.add(guild.id, delay)
+        log.loading(
+            f"[{guild.name}] Waiting {naturaldelta(timedelta(seconds=delay))} for next initiative..."
+        )
 
+    async def tick_initiative(self):
+        """Run due initiatives, each after random jitter within the tick (So guilds due together don't burst)."""
+        for guild_id in self.initiative_wheel.pop_due():
             self.task_manager.schedule(
-                id=f"initiative_{guild.id}",
-                callback=create_callback(guild),  # type: ignore
-                delay=random_delay(),
-                loop=True,
+                id=f"initiative_{guild_id}",
+                callback=partial(self.run_initiative, guild_id),
+                delay=random() * self.INITIATIVE_TICK,
             )
 
+    async def run_initiative(self, guild_id: int):
+        """Perform initiative in guild of given id within global concurrency cap, then reschedule it."""
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            log.warning(f"[{guild_id}] No longer in guild, stopping initiative.")
+            return
+        try:
+            async with self.initiative_semaphore:
+                await self.perform_initiative(guild)
+        except CancelledError:
+            log.warning(f"[{guild.name}] Initiative task was cancelled.")
+            return
+        except Exception as e:
+            log.error(f"[{guild.name}] Initiative task error: {str(e)}")
+        self.schedule_guild_initiative(guild)
+
     async def perform_initiative(self, guild: Guild):
         """Initiate interaction by sending random message to random member of given guild."""
 
@@ -343,7 +409,7 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             return
 
         # Get all text channels the bot can send messages in & Choose a random text channel
-        text_channels = await self.get_initiative_channels(guild)
+        text_channels = self.get_initiative_channels(guild)
         if not text_channels:
             log.warning(
                 f"[{guild.name}] No accessible text channels found in guild, skipping initiative."
@@ -351,11 +417,22 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             return
         channel = choice(text_channels)
 
-        #  Get the last messages in the channel
-        messages: list[Message] = []
-        async for message in channel.history(limit=self.MAX_CHANNEL_HISTORY):
-            if not message.author.bot:  # Filter out bot messages
-                messages.append(message)
+        #  Get the last messages in the channel (Dismiss if bot is author of latest message)
+        channel_messages = await self.channel_history.fetch(channel)
+        if (
+            channel_messages
+            and self.bot.user
+            and channel_messages[0].author_id == self.bot.user.id
+        ):
+            log.warning(
+                f"[{guild.name}][{channel.name}] Latest message in guild channel is own, skipping initiative."
+            )
+            return
+        messages = [
+            message
+            for message in channel_messages
+            if not message.author_is_bot  # Filter out bot messages
+        ]
         if not messages:
             log.warning(
                 f"[{guild.name}][{channel.name}] No recent user messages found in guild channel, skipping initiative."
@@ -363,62 +440,98 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             return
 
         # Choose a random message & its author as target member
-        message = choice(messages)
+        try:
+            message = await channel.fetch_message(choice(messages).id)
+        except HTTPException as e:
+            log.warning(
+                f"[{guild.name}][{channel.name}] Chosen message fetch failed ({e}), skipping initiative."
+            )
+            return
         member = message.author
 
         # Prepare prompt
-        text_prompt, file_prompt = await self.create_prompt(
+        prompt_blocks, file_prompt = await self.create_prompt(
             preface=self.create_prompt_intiative_preface(member),
             message=message,
         )
 
         # Send reply
         async with message.channel.typing():
-            self.ai.use_session(
-                guild.id,
-                history=(
-                    self.load_guild_history(guild)
-                    if guild
-                    else self.load_dm_history(member) if member else []
-                ),
-            )
+            await self.use_session(guild.id)
             await message.reply(
-                await self.ai.prompt(text_prompt, file_prompt)
+                await self.ai.prompt(guild.id, prompt_blocks, file_prompt)
                 or f"👋 {member.mention if member else "What? 😕"}"
             )
 
-    async def get_initiative_channels(self, guild: Guild):
-        """Get all valid channels for initiative."""
+    def get_initiative_channels(self, guild: Guild) -> list[TextChannel]:
+        """Get all valid channels for initiative, without REST calls.
+        Permitted channels are cached per guild, latest message authors come from channel history or gateway cache.
+        """
+        channel_ids = self.initiative_channels.get(guild.id)
+        if channel_ids is None:
+            channel_ids = self.initiative_channels.set(
+                guild.id,
+                [
+                    channel.id
+                    for channel in guild.text_channels
+                    if self.is_initiative_permitted(channel)
+                ],
+            )
         channels = []
-        for channel in guild.text_channels:
-            try:
-                # Dimiss inaccessible by @everyone (Non-pulic)
-                everyone_perms = channel.permissions_for(guild.default_role)
-                if not (
-                    everyone_perms.view_channel
-                    and everyone_perms.read_messages
-                    and everyone_perms.send_messages
-                ):
-                    continue
-
-                # Dismiss if inaccessible by bot
-                bot_perms = channel.permissions_for(guild.me)
-                if not (bot_perms.send_messages and bot_perms.read_message_history):
-                    continue
-
-                # Dismiss if bot is author of latest message (Prevent spam)
-                latest_message = None
-                async for message in channel.history(limit=1):
-                    latest_message = message
-                if latest_message and latest_message.author == self.bot.user:
-                    continue
-
-                # Add channel
-                channels.append(channel)
-            except Exception as e:
-                log.error(f"[{guild.name}][{channel.name}] Error: {str(e)}")
+        for channel_id in channel_ids:
+            channel = guild.get_channel(channel_id)
+            if not isinstance(channel, TextChannel):
+                continue
+
+            # Dismiss if bot is author of latest message (Prevent spam)
+            if channel.id in self.channel_history:
+                latest_message = self.channel_history.last(channel.id)
+                latest_author_id = latest_message and latest_message.author_id
+            else:
+                latest_author_id = (
+                    channel.last_message and channel.last_message.author.id
+                )
+            if self.bot.user and latest_author_id == self.bot.user.id:
+                continue
+
+            # Add channel
+            channels.append(channel)
         return channels
 
+    def is_initiative_permitted(self, channel: TextChannel) -> bool:
+        """Check if given channel is public & bot can read & send messages in it."""
+        guild = channel.guild
+        try:
+            # Dimiss inaccessible by @everyone (Non-pulic)
+            everyone_perms = channel.permissions_for(guild.default_role)
+            if not (
+                everyone_perms.view_channel
+                and everyone_perms.read_messages
+                and everyone_perms.send_messages
+            ):
+                return False
+
+            # Dismiss if inaccessible by bot
+            bot_perms = channel.permissions_for(guild.me)
+            return bot_perms.send_messages and bot_perms.read_message_history
+        except Exception as e:
+            log.error(f"[{guild.name}][{channel.name}] Error: {str(e)}")
+            return False
+
+    @Cog.listener()
+    async def on_guild_join(self, guild: Guild):
+        if self.task_manager.is_running("initiative_tick"):
+            self.schedule_guild_initiative(guild)
+
+    @Cog.listener()
+    async def on_guild_remove(self, guild: Guild):
+        self.initiative_wheel.discard(guild.id)
+        self.initiative_channels.pop(guild.id)
+
+    @Cog.listener()
+    async def on_guild_channel_update(self, before: GuildChannel, after: GuildChannel):
+        self.initiative_channels.pop(after.guild.id)  # Permissions may have changed
+
     # ----------------------------------------------------------------------------------------------------
 
     async def create_prompt(
@@ -428,9 +541,9 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
         channel: Messageable | None = None,
         guild: Guild | None = None,
         preface="",
-    ) -> tuple[str, ActFile | None]:
+    ) -> tuple[list[PromptBlock], ActFile | None]:
         """
-        Create prompt with flexible input options.
+        Create prompt (blocks, planned to prompt token budget when sent) with flexible input options.
             - Text prompt structure: '{**preface**}\\n{**message.author.mention**}:{file_action_desc}{**message.content**}\\n{**csv**}'
 
         Args:
@@ -493,7 +606,7 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                     embed_content.append(f"Field '{field.name}': {field.value}")
                 if embed.footer and embed.footer.text:
                     embed_content.append(f"Footer: {embed.footer.text}")
-                file = self.get_embed_file(embed)
+                file = await self.get_embed_file(embed)
                 if file:
                     embed_content.append(f"File: {file.name}")
                 else:
@@ -507,11 +620,12 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
 
         # Save member for context
         if isinstance(user, Member):
-            self.save_actor(user)
+            await self.save_actor(user)
         elif isinstance(user, User):
-            self.save_dm_actor(user)
+            await self.save_dm_actor(user)
 
         # Load saved guild members to prompt for context
+        blocks = [PromptBlock(text=text)]
         if message:
             channel = message.channel
         if channel:
@@ -521,17 +635,40 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
             channel_messages_csv, channel_members_csv = (
                 await self.get_channel_history_csv(channel)
             )
-            text += f"\nCurrent channel:{channel_name}"
-            text += f"\nMembers w/ recent messages in current channel:\n{channel_members_csv}"
-            text += f"\nLatest {self.MAX_CHANNEL_HISTORY} messages in current channel:{channel_messages_csv}\n"
+            blocks += [
+                PromptBlock(text=f"\nCurrent channel:{channel_name}", priority=1),
+                self.create_csv_block(
+                    "\nMembers w/ recent messages in current channel:",
+                    channel_members_csv,
+                    priority=3,
+                ),
+                self.create_csv_block(
+                    "\nLatest messages in current channel (newest first):",
+                    channel_messages_csv,
+                    priority=2,
+                ),
+            ]
         if guild:
-            text += f"\nMembers u talked w/ recently:\n{self.load_actors_csv(guild)}"
+            blocks.append(
+                self.create_csv_block(
+                    "\nMembers u talked w/ recently:",
+                    await self.load_actors_csv(guild),
+                    priority=4,
+                )
+            )
 
         # Return prompt components as tuple
-        return (text, file)
+        return (blocks, file)
 
     # ----------------------------------------------------------------------------------------------------
 
+    @staticmethod
+    def create_csv_block(label: str, lines: list[str], priority: int) -> PromptBlock:
+        """Create prompt block of given label & CSV lines (header first), truncatable to its leading rows."""
+        return PromptBlock(
+            text="\n".join([label, *lines[:1]]), units=lines[1:], priority=priority
+        )
+
     def create_prompt_intiative_preface(self, member: Member | User | None) -> str:
         return (
             f"Begin natural talk{f" w/ {member.mention} " if member else " "}that feels like ur own initiative."
@@ -562,69 +699,57 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
 
     # ----------------------------------------------------------------------------------------------------
 
-    async def get_channel_history(
+    async def get_channel_history_csv(
         self, channel: Messageable
-    ) -> tuple[list[Message], list[Member]]:
-        """Fetch (messages, members) of latest messages in given channel and unique members who sent those messages."""
-        messages = [
-            msg async for msg in channel.history(limit=self.MAX_CHANNEL_HISTORY)
-        ]
-        members = list(
-            {msg.author for msg in messages if isinstance(msg.author, Member)}
-        )
-        return messages, members
-
-    async def get_channel_history_csv(self, channel: Messageable) -> tuple[str, str]:
-        """Fetch (messages, members) CSV of latest messages in given channel and unique members who sent those messages."""
-        messages, members = await self.get_channel_history(channel)
-
-        def format_embed_to_str(embed: Embed) -> str:
-            parts = []
-            if embed.title:
-                parts.append(f"Title: {embed.title}")
-            if embed.description:
-                parts.append(f"Description: {embed.description}")
-            if embed.author and embed.author.name:
-                parts.append(f"Author: {embed.author.name}")
-            for field in embed.fields:
-                parts.append(f"Field '{field.name}': {field.value}")
-            if embed.footer and embed.footer.text:
-                parts.append(f"Footer: {embed.footer.text}")
-            if embed.image and embed.image.url:
-                parts.append(f"Image URL: {embed.image.url}")
-            if embed.thumbnail and embed.thumbnail.url:
-                parts.append(f"Thumbnail URL: {embed.thumbnail.url}")
-            if embed.url:
-                parts.append(f"URL: {embed.url}")
-            return f"{{ {'; '.join(parts)} }}"
-
-        messages_data = [
-            {
-                "author_id": str(msg.author.id),
-                "message_content": msg.content.replace("\n", " "),
-                "message_embed": (
-                    format_embed_to_str(msg.embeds[0]) if msg.embeds else ""
-                ),
-            }
-            for msg in messages
-        ]
+    ) -> tuple[list[str], list[str]]:
+        """Fetch (messages, members) CSV lines (header first) of latest messages in given channel, within channel context
+        chars budget, and unique members who sent those messages."""
+        messages = await self.channel_history.fetch(channel)
+        rows: list[str] = []
+        members: dict[int, ChannelMessage] = {}  # Author id -> latest message
+        chars_count = len(self.MESSAGE_CSV_HEADER)
+        for message in messages:
+            row = self.get_message_csv_row(message)
+            chars_count += len(row) + 1
+            if chars_count > self.MAX_CHANNEL_CONTEXT_CHARS:
+                break
+            rows.append(row)
+            if message.author_is_member:
+                members.setdefault(message.author_id, message)
         members_data = [
             {
-                "id": str(member.id),
-                "name": member.name,
-                "display_name": member.display_name,
+                "id": str(message.author_id),
+                "name": message.author_name,
+                "display_name": message.author_display_name,
             }
-            for member in members
+            for message in members.values()
         ]
-        return text_csv(messages_data, "|"), text_csv(members_data, "|")
+        messages_csv = [self.MESSAGE_CSV_HEADER, *rows] if rows else []
+        return messages_csv, text_csv_lines(members_data)
+
+    def get_message_csv_row(self, message: ChannelMessage) -> str:
+        """Get CSV row of given message for channel context, memoized by message id."""
+        row = self.message_csv_rows.get(message.id)
+        if row is None:
+            row = self.message_csv_rows.set(
+                message.id,
+                text_csv_row(
+                    {
+                        "author_id": str(message.author_id),
+                        "message_content": message.content.replace("\n", " "),
+                        "message_embed": message.embed,
+                    },
+                    " ",
+                ),
+            )
+        return row
 
     # ----------------------------------------------------------------------------------------------------
 
     async def get_sticker_file(self, sticker: StickerItem) -> ActFile | None:
         """Get file from sticker. If file size limit exceeded, get None."""
-        sticker_file = ActFile.load(sticker.url) if sticker.url else None
-        if sticker_file and sticker_file.size <= self.MAX_FILE_SIZE:
-            return sticker_file
+        if sticker.url:
+            return await self.file_cache.fetch(sticker.url, self.MAX_FILE_SIZE)
 
     async def get_attachment_file(self, attachment: Attachment) -> ActFile | None:
         """Get file from attachment. If file size limit exceeded, get None."""
@@ -635,7 +760,7 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
                 name=attachment.filename,
             )
 
-    def get_embed_file(self, embed: Embed) -> ActFile | None:
+    async def get_embed_file(self, embed: Embed) -> ActFile | None:
         """Get file from embed. If file size limit exceeded, get None."""
         url = None
         if embed.image and embed.image.url:
@@ -645,73 +770,224 @@ class AiCog(Cog, description="Integrated generative AI chat bot"):
         elif embed.url:
             url = embed.url
 
-        embed_file = ActFile.load(url) if url else None
-        if embed_file and embed_file.size <= self.MAX_FILE_SIZE:
-            return embed_file
+        if url:
+            return await self.file_cache.fetch(url, self.MAX_FILE_SIZE)
 
     # ----------------------------------------------------------------------------------------------------
 
-    def save_actor(self, member: Member):
-        db = self.bot.get_db(member.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+    async def save_actor(self, member: Member):
+        actor = await self.bot.get_actor(
+            member.guild, member.id
+        ) or self.bot.create_actor(member)
         actor.name = member.name
         actor.display_name = member.display_name
         actor.ai_interacted_at = datetime.now(UTC)
-        db.save(actor)
+        await self.bot.save_actors(member.guild, actor)
+        if (actors := self.recent_actors.get(member.guild.id)) is not None:
+            actors[:] = [
+                actor.model_dump(
+                    include={"id": True, "name": True, "display_name": True}
+                ),
+                *(data for data in actors if data["id"] != actor.id),
+            ][: self.MAX_ACTORS]
 
-    def save_dm_actor(self, user: User):
-        main_db = self.bot.get_db()
-        dm_actor = main_db.find_one(
+    async def save_dm_actor(self, user: User):
+        main_db = await self.bot.get_db()
+        dm_actor = await main_db.find_one(
             DmActor, DmActor.id == user.id
         ) or self.bot.create_dm_actor(user)
         dm_actor.name = user.name
         dm_actor.display_name = user.display_name
         dm_actor.ai_interacted_at = datetime.now(UTC)
-        main_db.save(dm_actor)
-
-    def load_actors(self, guild: Guild) -> list[dict[str, Any]]:
-        actors = self.bot.get_db(guild).find(
-            Actor, sort=query.desc(Actor.ai_interacted_at), limit=self.MAX_ACTORS
-        )
-        return [
-            actor.model_dump(include={"id": True, "name": True, "display_name": True})
-            for actor in actors
-        ]
+        await main_db.save(dm_actor)
+
+    async def load_actors(self, guild: Guild) -> list[dict[str, Any]]:
+        actors_data = self.recent_actors.get(guild.id)
+        if actors_data is None:
+            db = await self.bot.get_db(guild)
+            actors = await db.find(
+                Actor, sort=query.desc(Actor.ai_interacted_at), limit=self.MAX_ACTORS
+            )
+            actors_data = self.recent_actors.set(
+                guild.id,
+                [
+                    actor.model_dump(
+                        include={"id": True, "name": True, "display_name": True}
+                    )
+                    for actor in actors
+                ],
+            )
+        return actors_data
 
-    def load_actors_csv(self, guild: Guild) -> str:
-        actors = self.load_actors(guild)
-        return f"{text_csv(actors, "|")}" if actors else ""
+    async def load_actors_csv(self, guild: Guild) -> list[str]:
+        """Get CSV lines (header first) of members of given guild talked with recently."""
+        return text_csv_lines(await self.load_actors(guild))
 
     # ----------------------------------------------------------------------------------------------------
 
-    def save_guild_history(self, guild: Guild):
-        main_db = self.bot.get_db()
-        db_ref = main_db.find_one(
-            DbRef, DbRef.id == guild.id
-        ) or self.bot.create_db_ref(guild)
-        db_ref.ai_chat_history = self.ai.dump_history(guild.id)
-        main_db.save(db_ref)
-
-    def load_guild_history(self, guild: Guild) -> list | None:
-        main_db = self.bot.get_db()
-        db_ref = main_db.find_one(DbRef, DbRef.id == guild.id)
-        if db_ref:
-            return db_ref.ai_chat_history
-
-    def save_dm_history(self, user: User):
-        main_db = self.bot.get_db()
-        dm_actor = main_db.find_one(
-            DmActor, DmActor.id == user.id
-        ) or self.bot.create_dm_actor(user)
-        dm_actor.ai_chat_history = self.ai.dump_history(user.id)
-        main_db.save(dm_actor)
-
-    def load_dm_history(self, user: User) -> list | None:
-        main_db = self.bot.get_db()
-        dm_actor = main_db.find_one(DmActor, DmActor.id == user.id)
-        if dm_actor:
-            return dm_actor.ai_chat_history
+    async def use_session(self, id: int):
+        """Use AI chat session of given id. If not live, restore it from history saved in database.
+        Then evict (save) cold sessions."""
+        if not self.ai.has_session(id):
+            async with self.session_lock:  # Wait for evicted sessions to be saved
+                if not self.ai.has_session(id):  # Not restored meanwhile
+                    history, last_seq = await self.load_history(id)
+                    self.ai.use_session(id, history=history)
+                    self.history_marks[id] = (self.ai.history_length(id), last_seq)
+        self.ai.use_session(id)
+        await self.evict_sessions()
+
+    async def evict_sessions(self):
+        """Remove cold AI chat sessions from memory, saving their unsaved history to database."""
+        async with self.session_lock:
+            cold_sessions = self.ai.pop_cold_sessions()
+            for id, history in cold_sessions.items():
+                try:
+                    await self.save_history(id, history)
+                except Exception as e:
+                    log.exception(f"AI chat session {id} eviction save failed: {e}")
+                self.history_marks.pop(id, None)
+                self.history_locks.pop(id, None)
+        if cold_sessions:
+            log.info(
+                f"AI chat sessions evicted: {len(cold_sessions)} "
+                f"(live: {self.ai.session_count}, {self.ai.session_bytes} bytes)"
+            )
+
+    async def save_history(self, id: int, history: list[dict[str, Any]] | None = None):
+        """Append contents of AI chat session of given id not saved yet to database, and cap saved history.
+        If given full history (of evicted session), save from it instead of live session.
+        """
+        # Saves of a session are serialized, and only marked once written, so a failed save is retried by next one
+        async with self.history_locks.setdefault(id, Lock()):
+            saved_count, last_seq = self.history_marks.get(id, (0, 0))
+            count = len(history) if history is not None else self.ai.history_length(id)
+            if count <= saved_count:
+                return
+            contents = (
+                history[saved_count:][-self.MAX_SESSION_HISTORY :]
+                if history is not None
+                else self.ai.dump_history(id, self.MAX_SESSION_HISTORY, saved_count)
+            )
+            seq = await self.insert_turns(id, contents, last_seq)
+            self.history_marks[id] = (count, seq)
+            if seq // self.MAX_SESSION_HISTORY > last_seq // self.MAX_SESSION_HISTORY:
+                main_db = await self.bot.get_db()
+                await main_db.get_collection(ChatTurn).delete_many(
+                    {"session_id": id, "seq": {"$lte": seq - self.MAX_SESSION_HISTORY}}
+                )  # Drop contents no longer loaded, once per history span
+
+    async def insert_turns(
+        self, id: int, contents: list[dict[str, Any]], last_seq: int
+    ) -> int:
+        """Save given contents of AI chat session of given id to database, after given last saved seq. Get new last seq.
+        Contents already saved by an earlier failed attempt are skipped."""
+        turns = [
+            ChatTurn(session_id=id, seq=last_seq + i, content=content)
+            for i, content in enumerate(contents, start=1)
+        ]
+        if turns:
+            main_db = await self.bot.get_db()
+            try:
+                await main_db.get_collection(ChatTurn).insert_many(
+                    [turn.model_dump_doc() for turn in turns], ordered=False
+                )
+            except BulkWriteError as e:
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise  # Not only duplicate key errors
+        return last_seq + len(turns)
+
+    async def load_history(self, id: int) -> tuple[list[dict[str, Any]], int]:
+        """Get (history, last seq) tuple of summary & last contents of AI chat session of given id
+        saved in database. If none saved, migrate legacy history."""
+        main_db = await self.bot.get_db()
+        summary = await main_db.find_one(ChatSummary, ChatSummary.id == id)
+        turns = await main_db.find(
+            ChatTurn,
+            ChatTurn.session_id == id,
+            ChatTurn.seq > (summary.seq if summary else 0),
+            sort=query.desc(ChatTurn.seq),
+            limit=self.MAX_SESSION_HISTORY,
+        )
+        if not turns and not summary:
+            history = await self.migrate_history(id)
+            return history, len(history)
+        history = [turn.content for turn in reversed(turns)]
+        if summary:
+            history[:0] = [
+                content.model_dump(exclude_unset=True)
+                for content in ActAi.summary_history(summary.text)
+            ]
+        return history, turns[0].seq if turns else summary.seq  # type: ignore
+
+    async def summarize_history(self, id: int):
+        """If AI chat session of given id is too long, compress its older contents into a rolling summary saved in database."""
+        if self.ai.history_length(id) <= self.MAX_SESSION_HISTORY:
+            return
+        await self.save_history(id)
+        try:
+            result = await self.ai.summarize_session(id, self.SUMMARY_KEPT_HISTORY)
+        except Exception as e:
+            log.exception(f"AI chat session {id} summary failed: {e}")
+            return
+        if not result:
+            return
+        summary, summarized_count = result
+        async with self.history_locks.setdefault(id, Lock()):
+            saved_count, last_seq = self.history_marks.get(id, (0, 0))
+            unsummarized_saved_count = max(0, saved_count - summarized_count)
+            summary_count = len(ActAi.summary_history(summary))
+            self.history_marks[id] = (
+                unsummarized_saved_count + summary_count,
+                last_seq,
+            )
+            main_db = await self.bot.get_db()
+            await main_db.save(
+                ChatSummary(
+                    id=id, text=summary, seq=last_seq - unsummarized_saved_count
+                )
+            )
+
+    async def clear_history(self, id: int) -> bool:
+        """Delete saved history (including legacy) of AI chat session of given id. If none, get False."""
+        main_db = await self.bot.get_db()
+        turns_result = await main_db.get_collection(ChatTurn).delete_many(
+            {"session_id": id}
+        )
+        summary_result = await main_db.get_collection(ChatSummary).delete_one(
+            {"_id": id}
+        )
+        legacy_count = 0
+        for model in (DbRef, DmActor):
+            legacy_result = await main_db.get_collection(model).update_one(
+                {"_id": id, "ai_chat_history": {"$exists": True}},
+                {"$unset": {"ai_chat_history": ""}},
+            )
+            legacy_count += legacy_result.modified_count
+        self.history_marks.pop(id, None)
+        self.history_locks.pop(id, None)
+        return bool(
+            turns_result.deleted_count or summary_result.deleted_count or legacy_count
+        )
+
+    async def migrate_history(self, id: int) -> list[dict[str, Any]]:
+        """Move legacy history of given id stored in its guild database reference or dm-actor to saved history,
+        and get it. Legacy history is removed only once saved, so it is not lost if interrupted.
+        """
+        main_db = await self.bot.get_db()
+        for model in (DbRef, DmActor):
+            collection = main_db.get_collection(model)
+            doc = await collection.find_one(
+                {"_id": id, "ai_chat_history": {"$exists": True}},
+                {"ai_chat_history": True},
+            )
+            if doc:
+                history = doc["ai_chat_history"][-self.MAX_SESSION_HISTORY :]
+                await self.insert_turns(id, history, 0)
+                await collection.update_one(
+                    {"_id": id}, {"$unset": {"ai_chat_history": ""}}
+                )
+                return history
+        return []
 
     # ----------------------------------------------------------------------------------------------------
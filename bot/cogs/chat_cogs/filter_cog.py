@@ -8,7 +8,6 @@ from profanity_check import predict_prob
 
 from bot.main import ActBot
 from bot.ui.embed import EmbedX
-from db.actor import Actor
 from utils.log import logger
 
 log = logger(__name__)
@@ -62,8 +61,7 @@ class FilterCog(Cog, description="Filter blacklisted message content."):
             return
 
         # Penalize by gold
-        db = self.bot.get_db(message.guild)
-        actor = db.find_one(Actor, Actor.id == member.id)
+        actor = await self.bot.get_actor(message.guild, member.id)
         if not actor:
             actor = self.bot.create_actor(member)
         debt_gold = 0
@@ -72,7 +70,7 @@ class FilterCog(Cog, description="Filter blacklisted message content."):
         else:
             debt_gold = self.GOLD_PENALTY - actor.gold
             actor.gold = 0
-        db.save(actor)
+        await self.bot.save_actors(message.guild, actor)
         self.offenses[member.id] = 0
 
         # Penalize by timeout (if insufficient gold)
@@ -1,3 +1,5 @@
+from datetime import UTC
+
 from discord import (
     Attachment,
     Interaction,
@@ -7,6 +9,7 @@ from discord import (
     User,
     VoiceChannel,
     app_commands,
+    utils,
 )
 from discord.ext.commands import Cog
 from discord.utils import MISSING
@@ -94,8 +97,8 @@ class ConsoleCog(Cog, description="Provide control and management interface"):
         guild = interaction.guild
         if not guild:
             return
-        db = self.bot.get_db(guild)
-        actors = list(db.find(Actor))
+        db = await self.bot.get_db(guild)
+        actors = await db.find(Actor)
         removed_members_count = 0
         for actor in actors:
             member = None
@@ -112,7 +115,8 @@ class ConsoleCog(Cog, description="Provide control and management interface"):
             else:
                 actor.is_member = False
                 removed_members_count += 1
-        db.save_all(actors)
+        await db.save_all(actors)
+        self.bot.uncache_actors(guild)
         await interaction.followup.send(
             embed=EmbedX.success(
                 title="Actors Synchronization",
@@ -121,6 +125,37 @@ class ConsoleCog(Cog, description="Provide control and management interface"):
             ephemeral=True,
         )
 
+    # ----------------------------------------------------------------------------------------------------
+    # * Index Stats
+    # ----------------------------------------------------------------------------------------------------
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.command(
+        description="Show usage of actors database indexes",
+        extras={"category": "Console"},
+    )
+    async def index_stats(self, interaction: Interaction):
+        await interaction.response.defer(ephemeral=True)
+        guild = interaction.guild
+        if not guild:
+            return
+        db = await self.bot.get_db(guild)
+        stats = await (
+            db.get_collection(Actor).aggregate([{"$indexStats": {}}]).to_list(None)
+        )
+        lines = [
+            f"`{stat["name"]}` ― **{stat["accesses"]["ops"]}** use(s) since {utils.format_dt(stat["accesses"]["since"].replace(tzinfo=UTC), "R")}"
+            for stat in sorted(stats, key=lambda stat: stat["name"])
+        ]
+        await interaction.followup.send(
+            embed=EmbedX.info(
+                title="Index Stats",
+                description="\n".join(lines) or "No indexes found.",
+            ),
+            ephemeral=True,
+        )
+
     # ----------------------------------------------------------------------------------------------------
     # * Join
     # ----------------------------------------------------------------------------------------------------
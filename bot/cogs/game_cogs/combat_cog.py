@@ -42,9 +42,8 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
             return
 
         # Retrieve attacker actor
-        db = self.bot.get_db(interaction.guild)
-        attacker_actor = db.find_one(
-            Actor, Actor.id == attacker_member.id
+        attacker_actor = await self.bot.get_actor(
+            interaction.guild, attacker_member.id
         ) or self.bot.create_actor(attacker_member)
         if not attacker_actor:
             await interaction.followup.send(
@@ -53,8 +52,8 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
             return
 
         # Retrieve defender actor
-        defender_actor = db.find_one(
-            Actor, Actor.id == defender_member.id
+        defender_actor = await self.bot.get_actor(
+            interaction.guild, defender_member.id
         ) or self.bot.create_actor(defender_member)
         if not defender_actor:
             await interaction.followup.send(
@@ -104,7 +103,7 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
         attack.perform()
 
         # Save user data
-        db.save_all([attacker_actor, defender_actor])
+        await self.bot.save_actors(interaction.guild, attacker_actor, defender_actor)
 
         # Send private response
         await interaction.followup.send(
@@ -278,10 +277,9 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
 
         # Get actor
         await interaction.response.defer(ephemeral=True)
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
 
         # Check health
         if actor.health > 0:
@@ -299,7 +297,7 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
         # Recover health & energy
         actor.health = actor.health_max
         actor.energy = actor.energy_max
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
 
         # Send private response
         response_msg = f"You have recovered!\nIt cost **💰 {revive_cost}** gold."
@@ -350,15 +348,14 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
 
         # Get actor
         await interaction.response.defer(ephemeral=True)
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
 
         # Recover health & energy
         actor.health = actor.health_max
         actor.energy = actor.energy_max
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
 
         # Send response
         await interaction.followup.send(
@@ -384,14 +381,15 @@ class CombatCog(Cog, description="Allow players to engage in battles"):
 
         # Update actors
         await interaction.response.defer(ephemeral=True)
-        db = self.bot.get_db(guild)
-        actors = list(db.find(Actor))
+        db = await self.bot.get_db(guild)
+        actors = await db.find(Actor)
         for actor in actors:
             actor.items_equipped.clear()
             actor.clear_extra_stats()
             actor.health = actor.health_max
             actor.energy = actor.energy_max
-        db.save_all(actors)
+        await db.save_all(actors)
+        self.bot.uncache_actors(guild)
         await interaction.followup.send(
             embed=EmbedX.success(f"Stats reset for **{len(actors)}** actors.")
         )
@@ -6,7 +6,6 @@ from discord.ext.commands import Cog
 
 from bot.main import ActBot
 from bot.ui.embed import EmbedX
-from db.actor import Actor
 from utils.misc import numsign
 
 
@@ -48,10 +47,9 @@ class ExchangeCog(Cog, description="Allow players to exchange gold and goods"):
 
         # Retrieve donor user
         await interaction.response.defer(ephemeral=True)
-        db = self.bot.get_db(interaction.guild)
         donor_member = interaction.user
-        donor_actor = db.find_one(
-            Actor, Actor.id == donor_member.id
+        donor_actor = await self.bot.get_actor(
+            interaction.guild, donor_member.id
         ) or self.bot.create_actor(donor_member)
         if not donor_actor:
             await interaction.followup.send(
@@ -61,8 +59,8 @@ class ExchangeCog(Cog, description="Allow players to exchange gold and goods"):
 
         # Retrieve recipient user
         recipient_member = member
-        recipient_actor = db.find_one(
-            Actor, Actor.id == recipient_member.id
+        recipient_actor = await self.bot.get_actor(
+            interaction.guild, recipient_member.id
         ) or self.bot.create_actor(recipient_member)
         if not recipient_actor:
             await interaction.followup.send(
@@ -91,7 +89,7 @@ class ExchangeCog(Cog, description="Allow players to exchange gold and goods"):
         # Add gold and update user data
         donor_actor.gold = max(0, donor_actor.gold - gold)
         recipient_actor.gold += gold
-        db.save_all([donor_actor, recipient_actor])
+        await self.bot.save_actors(interaction.guild, donor_actor, recipient_actor)
 
         # Send private response
         await interaction.followup.send(
@@ -1,5 +1,6 @@
 import re
 from asyncio import sleep
+from datetime import UTC, datetime
 from random import randint
 
 import humanize
@@ -25,8 +26,11 @@ from discord.ext.commands import Cog
 
 from bot.main import ActBot
 from bot.ui.embed import EmbedX
-from db.actor import Actor
+from bot.xp_backfill import XpBackfill
 from db.room import Room
+from db.xp_backfill import XpBackfillCheckpoint
+from db.xp_buffer import XpBuffer
+from db.xp_gain import XpGain, XpGainReport
 from utils.xp import Experience
 
 
@@ -34,31 +38,35 @@ from utils.xp import Experience
 # * Farm Cog
 # ----------------------------------------------------------------------------------------------------
 class FarmCog(Cog, description="Allow players to gain stats and roles"):
+    XP_LOG_MAX_ACTORS = 50  # top gainers per xp log report
+
     def __init__(self, bot: ActBot):
         self.bot = bot
-        self.xp_gain_log: dict[int, dict[int, int]] = {}
+        self.xp_buffer = XpBuffer()
+        self.backfilling_guild_ids: set[int] = set()
         self.log_xp_gains.start()
+        self.flush_xp_gains.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.log_xp_gains.cancel()
+        self.flush_xp_gains.cancel()
+        await self.flush_xp_buffer()
+
+    # ----------------------------------------------------------------------------------------------------
+    # * Flush XP Gains
+    # ----------------------------------------------------------------------------------------------------
+    @tasks.loop(seconds=30.0)
+    async def flush_xp_gains(self):
+        await self.flush_xp_buffer()
 
     # ----------------------------------------------------------------------------------------------------
     # * Log XP Gains
     # ----------------------------------------------------------------------------------------------------
-    @tasks.loop(seconds=21600.0)  # 6 hrs
+    @tasks.loop(seconds=3600.0)  # 1 hr, reports are sent once per report period
     async def log_xp_gains(self):
-        log_copy = self.xp_gain_log.copy()
-        self.xp_gain_log.clear()
-
-        for guild_id, user_gains in log_copy.items():
-            if not user_gains:
-                continue
-
-            guild = self.bot.get_guild(guild_id)
-            if not guild:
-                continue
-
-            log_room = self.load_room(id=FarmCog.__name__, guild=guild)
+        now = datetime.now(UTC)
+        for guild in self.bot.guilds:
+            log_room = await self.load_room(id=FarmCog.__name__, guild=guild)
             if not log_room:
                 continue
 
@@ -66,26 +74,39 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
             if not (log_channel and isinstance(log_channel, TextChannel)):
                 continue
 
-            description_lines = []
-            for user_id, total_xp in sorted(
-                user_gains.items(), key=lambda item: item[1], reverse=True
-            ):
-                description_lines.append(f"<@{user_id}> +**{total_xp}** _xp_.")
-
-            if not description_lines:
+            # Get gains since last report, up to end of last complete period
+            db = await self.bot.get_db(guild)
+            report = await db.find_one(XpGainReport) or XpGainReport.first(now)
+            period_end = XpGainReport.period_end(now)
+            if report.reported_until.replace(tzinfo=UTC) >= period_end:
                 continue
-
-            embed = EmbedX.info(
-                emoji="⏫",
-                title="Experience",
-                description="\n".join(description_lines),
+            user_gains = await XpGain.totals(
+                db,
+                since=report.reported_until.replace(tzinfo=UTC),
+                until=period_end,
+                limit=self.XP_LOG_MAX_ACTORS,
             )
-            try:
-                await log_channel.send(embed=embed)
-            except HTTPException as e:
-                print(
-                    f"Failed to send XP log to #{log_channel.name} in {guild.name}: {e}"
+            if user_gains:
+                description_lines = []
+                for user_id, total_xp in user_gains:
+                    description_lines.append(f"<@{user_id}> +**{total_xp}** _xp_.")
+
+                embed = EmbedX.info(
+                    emoji="⏫",
+                    title="Experience",
+                    description="\n".join(description_lines),
                 )
+                try:
+                    await log_channel.send(embed=embed)
+                except HTTPException as e:
+                    print(
+                        f"Failed to send XP log to #{log_channel.name} in {guild.name}: {e}"
+                    )
+                    continue  # Not marked as reported, so retried next time
+
+            # Mark as reported
+            report.reported_until = period_end
+            await db.save(report)
 
     @log_xp_gains.before_loop
     async def before_log_xp_gains(self):
@@ -116,7 +137,7 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
             )
 
         if unset:
-            self.delete_room(id=FarmCog.__name__, guild=interaction.guild)
+            await self.delete_room(id=FarmCog.__name__, guild=interaction.guild)
             return await interaction.response.send_message(
                 embed=EmbedX.success(
                     title="Farm Log Channel Unset",
@@ -126,7 +147,9 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
             )
 
         if not channel:
-            log_room = self.load_room(id=FarmCog.__name__, guild=interaction.guild)
+            log_room = await self.load_room(
+                id=FarmCog.__name__, guild=interaction.guild
+            )
             log_channel = (
                 interaction.guild.get_channel(log_room.channel_id) if log_room else None
             )
@@ -142,7 +165,7 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
                 ephemeral=True,
             )
 
-        self.save_room(id=FarmCog.__name__, channel=channel)
+        await self.save_room(id=FarmCog.__name__, channel=channel)
         await interaction.response.send_message(
             embed=EmbedX.success(
                 title="Farm Log Channel Set",
@@ -151,12 +174,118 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
             ephemeral=True,
         )
 
+    # ----------------------------------------------------------------------------------------------------
+    # * Backfill XP
+    # ----------------------------------------------------------------------------------------------------
+    @app_commands.guild_only()
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.command(
+        description="Compute xp from channels history", extras={"category": "Farm"}
+    )
+    @app_commands.describe(
+        channel="Only backfill this channel (all by default)",
+        reset="Replace xp instead of adding it",
+        restart="Discard interrupted backfill instead of resuming it",
+    )
+    async def backfill_xp(
+        self,
+        interaction: Interaction,
+        channel: TextChannel | None = None,
+        reset: bool = False,
+        restart: bool = False,
+    ):
+        guild = interaction.guild
+        if not guild:
+            return await interaction.response.send_message(
+                embed=EmbedX.error(
+                    title="Guild Only",
+                    description="This command can only be used in a server.",
+                ),
+                ephemeral=True,
+            )
+        if guild.id in self.backfilling_guild_ids:
+            return await interaction.response.send_message(
+                embed=EmbedX.warning(
+                    title="Backfill In Progress",
+                    description="XP backfill is already running in this server.",
+                ),
+                ephemeral=True,
+            )
+
+        await interaction.response.defer(ephemeral=True)
+        self.backfilling_guild_ids.add(guild.id)
+        try:
+            backfill = XpBackfill(await self.bot.get_db(guild), guild)
+            if await backfill.load():
+                if restart:
+                    await backfill.discard()
+                elif channel or reset:
+                    return await interaction.followup.send(
+                        embed=EmbedX.warning(
+                            title="Backfill Interrupted",
+                            description="An interrupted XP backfill exists. Resume it without options, or restart it.",
+                        ),
+                        ephemeral=True,
+                    )
+            status_message = await interaction.followup.send(
+                embed=EmbedX.info(
+                    emoji="⏳", title="XP Backfill", description="Starting..."
+                ),
+                ephemeral=True,
+                wait=True,
+            )
+
+            async def show_progress(checkpoint: XpBackfillCheckpoint):
+                try:
+                    await status_message.edit(
+                        embed=EmbedX.info(
+                            emoji="⏳",
+                            title="XP Backfill",
+                            description=self.backfill_progress_text(checkpoint),
+                        )
+                    )
+                except HTTPException:
+                    pass  # Interaction token expired
+
+            backfill.on_progress = show_progress
+            # Live gains are held while actors are rewritten, then added on top. If new reset, pending xp is dropped,
+            # as its messages are recounted (Run sets its history end right away, so no message falls in between)
+            self.xp_buffer.hold(guild.id, drop_xp=reset and not backfill.checkpoint)
+            checkpoint = await backfill.run(
+                [channel] if channel else None, is_reset=reset
+            )
+        finally:
+            self.backfilling_guild_ids.discard(guild.id)
+            await self.xp_buffer.release(guild.id)
+            await self.flush_xp_buffer()
+            self.bot.uncache_actors(guild)
+
+        embed = EmbedX.success(
+            title="XP Backfill",
+            description=self.backfill_progress_text(checkpoint),
+        )
+        try:
+            await status_message.edit(embed=embed)
+        except HTTPException:
+            await interaction.channel.send(embed=embed)  # type: ignore
+
+    @staticmethod
+    def backfill_progress_text(checkpoint: XpBackfillCheckpoint) -> str:
+        text = (
+            f"Scored **{checkpoint.messages_count}** messages "
+            f"in **{len(checkpoint.done_channel_ids)}/{len(checkpoint.channel_ids)}** channels."
+        )
+        if checkpoint.is_scanned:
+            text += f"\n{'Replaced' if checkpoint.is_reset else 'Added'} xp of **{checkpoint.applied_count}/{len(checkpoint.xp_totals)}** actors."
+        return text
+
     # ----------------------------------------------------------------------------------------------------
     # * On Member Join
     # ----------------------------------------------------------------------------------------------------
     @Cog.listener()
     async def on_member_join(self, member: Member):
-        log_room = self.load_room(id=FarmCog.__name__, guild=member.guild)
+        log_room = await self.load_room(id=FarmCog.__name__, guild=member.guild)
         log_channel = (
             member.guild.get_channel(log_room.channel_id) if log_room else None
         )
@@ -170,19 +299,18 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
             embed.set_thumbnail(url=member.display_avatar)
             await log_channel.send(embed=embed)
 
-        db = self.bot.get_db(member.guild)
-        actor = db.find_one(Actor, Actor.id == member.id)
+        actor = await self.bot.get_actor(member.guild, member.id)
         if not actor:
             actor = self.bot.create_actor(member)
         actor.is_member = True
-        db.save(actor)
+        await self.bot.save_actors(member.guild, actor)
 
     # ----------------------------------------------------------------------------------------------------
     # * On Member Remove
     # ----------------------------------------------------------------------------------------------------
     @Cog.listener()
     async def on_member_remove(self, member: Member):
-        log_room = self.load_room(id=FarmCog.__name__, guild=member.guild)
+        log_room = await self.load_room(id=FarmCog.__name__, guild=member.guild)
         log_channel = (
             member.guild.get_channel(log_room.channel_id) if log_room else None
         )
@@ -236,19 +364,18 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
                 embed.set_thumbnail(url=member.display_avatar)
                 await log_channel.send(embed=embed)
 
-        db = self.bot.get_db(member.guild)
-        actor = db.find_one(Actor, Actor.id == member.id)
+        actor = await self.bot.get_actor(member.guild, member.id)
         if not actor:
             return
         actor.is_member = False
-        db.save(actor)
+        await self.bot.save_actors(member.guild, actor)
 
     # ----------------------------------------------------------------------------------------------------
     # * On Member Update
     # ----------------------------------------------------------------------------------------------------
     @Cog.listener()
     async def on_member_update(self, member_before: Member, member_after: Member):
-        log_room = self.load_room(id=FarmCog.__name__, guild=member_after.guild)
+        log_room = await self.load_room(id=FarmCog.__name__, guild=member_after.guild)
         if not log_room:
             return
 
@@ -325,11 +452,12 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
         if member.bot:
             return
 
-        # Get or create actor
-        db = self.bot.get_db(message.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        # Get or create actor (buffered, written to database on flush)
+        db = await self.bot.get_db(message.guild)
+        guild_id = message.guild.id
+        actor = await self.xp_buffer.load(db, guild_id, self.bot.create_actor(member))
+        if not actor:
+            return
 
         # Gain xp per message sent
         xp_reward = Experience.calculate_reward(
@@ -339,23 +467,13 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
             sticker_count=len(message.stickers),
         )
 
-        actor.xp += xp_reward
+        self.xp_buffer.gain(guild_id, actor, xp=xp_reward)
         print(f"👤 @{member.name} earned {xp_reward} xp.")
 
-        # Accumulate xp gain to log later
-        if xp_reward > 0:
-            guild_id = message.guild.id
-            user_id = member.id
-            if guild_id not in self.xp_gain_log:
-                self.xp_gain_log[guild_id] = {}
-            self.xp_gain_log[guild_id][user_id] = (
-                self.xp_gain_log[guild_id].get(user_id, 0) + xp_reward
-            )
-
-        # Try level-up
-        if actor.try_level_up():
-            gold_reward = actor.current_level_gold
-            actor.gold += gold_reward
+        # Try level-up (Gold rewarded for each level reached)
+        if levels_gained := actor.try_level_up():
+            gold_reward = actor.levels_gold(actor.level - levels_gained, actor.level)
+            self.xp_buffer.gain(guild_id, actor, gold=gold_reward)
             embed = EmbedX.success(
                 emoji="🏅",
                 title="Level Up",
@@ -388,27 +506,36 @@ class FarmCog(Cog, description="Allow players to gain stats and roles"):
         #         content=f"Congratulations, {member.mention}! 🎉", embed=embed
         #     )
 
-        # Save changes
-        db.save(actor)
+        # Save changes in batch once enough actors are pending
+        if self.xp_buffer.is_full:
+            await self.flush_xp_buffer()
 
     # ----------------------------------------------------------------------------------------------------
 
-    def save_room(self, id: str, channel: TextChannel | VoiceChannel):
-        db = self.bot.get_db(channel.guild)
-        room = db.find_one(Room, Room.id == id) or self.bot.create_room(id, channel)
+    async def flush_xp_buffer(self):
+        """Write buffered xp gains to database and drop written actors from bot cache."""
+        for guild_id, actor_id in await self.xp_buffer.flush():
+            self.bot.uncache_actors(guild_id, actor_id)
+
+    async def save_room(self, id: str, channel: TextChannel | VoiceChannel):
+        db = await self.bot.get_db(channel.guild)
+        room = await db.find_one(Room, Room.id == id) or self.bot.create_room(
+            id, channel
+        )
         room.channel_id = channel.id
         room.channel_name = channel.name
         room.channel_is_voice = isinstance(channel, VoiceChannel)
-        db.save(room)
+        await db.save(room)
 
-    def delete_room(self, id: str, guild: Guild):
-        db = self.bot.get_db(guild)
-        room = db.find_one(Room, Room.id == id)
+    async def delete_room(self, id: str, guild: Guild):
+        db = await self.bot.get_db(guild)
+        room = await db.find_one(Room, Room.id == id)
         if room:
-            db.delete(room)
+            await db.delete(room)
 
-    def load_room(self, id: str, guild: Guild) -> Room | None:
-        return self.bot.get_db(guild).find_one(Room, Room.id == id)
+    async def load_room(self, id: str, guild: Guild) -> Room | None:
+        db = await self.bot.get_db(guild)
+        return await db.find_one(Room, Room.id == id)
 
     # @staticmethod
     # async def try_award_role(member: Member, role_name: str) -> Role | None:
@@ -7,7 +7,6 @@ from humanize import intcomma, intword
 
 from bot.main import ActBot
 from bot.ui.embed import EmbedX
-from db.actor import Actor
 from db.item import Item, ItemStack, ItemType
 from db.main import ActToml
 from utils.misc import numsign
@@ -116,10 +115,9 @@ class InventoryCog(Cog, description="Acquire and use items"):
             return
 
         # Get actor
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
 
         # Chek actor has enough gold to buy
         total_price = item.price * quantity
@@ -141,7 +139,7 @@ class InventoryCog(Cog, description="Acquire and use items"):
         else:
             item_stack = ItemStack(id=item.id, item=item, quantity=quantity)
         actor.item_stacks[item.id] = item_stack
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
 
         # Send private response
         await interaction.followup.send(
@@ -200,10 +198,9 @@ class InventoryCog(Cog, description="Acquire and use items"):
 
         # Get actor
         await interaction.response.defer(ephemeral=True)
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
 
         # Get item stack
         item_stack = actor.item_stacks.get(item_id)
@@ -239,7 +236,7 @@ class InventoryCog(Cog, description="Acquire and use items"):
         item_stack.quantity -= quantity
         if item_stack.quantity <= 0:
             del actor.item_stacks[item.id]
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
 
         # Send private response
         await interaction.followup.send(
@@ -283,10 +280,9 @@ class InventoryCog(Cog, description="Acquire and use items"):
             return
 
         # Get actor
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
         if actor.health <= 0:
             await interaction.response.send_message(
                 embed=EmbedX.warning("You are defeated and cannot equip item!"),
@@ -325,7 +321,7 @@ class InventoryCog(Cog, description="Acquire and use items"):
             return
         actor.items_equipped[item.id] = item
         actor.add_item_stats(item)
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
         await interaction.followup.send(
             embed=EmbedX.success(
                 f"You equipped **{item.emoji or item.alt_emoji} {item.name}**."
@@ -365,10 +361,9 @@ class InventoryCog(Cog, description="Acquire and use items"):
             return
 
         # Get actor
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
         if actor.health <= 0:
             await interaction.response.send_message(
                 embed=EmbedX.warning("You are defeated and cannot unequip item!"),
@@ -396,7 +391,7 @@ class InventoryCog(Cog, description="Acquire and use items"):
             return
         del actor.items_equipped[item.id]
         actor.add_item_stats(item, scale=-1)
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
         await interaction.followup.send(
             embed=EmbedX.success(
                 f"You unequipped **{item.emoji or item.alt_emoji} {item.name}**."
@@ -436,10 +431,9 @@ class InventoryCog(Cog, description="Acquire and use items"):
             return
 
         # Get actor
-        db = self.bot.get_db(interaction.guild)
-        actor = db.find_one(Actor, Actor.id == member.id) or self.bot.create_actor(
-            member
-        )
+        actor = await self.bot.get_actor(
+            interaction.guild, member.id
+        ) or self.bot.create_actor(member)
         if actor.health <= 0:
             await interaction.response.send_message(
                 embed=EmbedX.warning("You are defeated and cannot use item!"),
@@ -462,7 +456,7 @@ class InventoryCog(Cog, description="Acquire and use items"):
         item_stack.quantity = max(0, item_stack.quantity - 1)
         if item_stack.quantity <= 0:
             del actor.item_stacks[item.id]
-        db.save(actor)
+        await self.bot.save_actors(interaction.guild, actor)
         await interaction.followup.send(
             embed=EmbedX.success(
                 f"You consumed **{item.emoji or item.alt_emoji} {item.name}**."
@@ -524,8 +518,8 @@ class InventoryCog(Cog, description="Acquire and use items"):
         member = interaction.user
         if not isinstance(member, Member):
             return []
-        actor = self.bot.get_db(interaction.guild).find_one(
-            Actor, Actor.id == interaction.user.id
+        actor = await self.bot.get_actor(
+            interaction.guild, interaction.user.id
         ) or self.bot.create_actor(member)
         return [
             app_commands.Choice(
@@ -547,8 +541,8 @@ class InventoryCog(Cog, description="Acquire and use items"):
         member = interaction.user
         if not isinstance(member, Member):
             return []
-        actor = self.bot.get_db(interaction.guild).find_one(
-            Actor, Actor.id == interaction.user.id
+        actor = await self.bot.get_actor(
+            interaction.guild, interaction.user.id
         ) or self.bot.create_actor(member)
         return [
             app_commands.Choice(
@@ -570,8 +564,8 @@ class InventoryCog(Cog, description="Acquire and use items"):
         member = interaction.user
         if not isinstance(member, Member):
             return []
-        actor = self.bot.get_db(interaction.guild).find_one(
-            Actor, Actor.id == interaction.user.id
+        actor = await self.bot.get_actor(
+            interaction.guild, interaction.user.id
         ) or self.bot.create_actor(member)
         return [
             app_commands.Choice(
@@ -593,8 +587,8 @@ class InventoryCog(Cog, description="Acquire and use items"):
         member = interaction.user
         if not isinstance(member, Member):
             return []
-        actor = self.bot.get_db(interaction.guild).find_one(
-            Actor, Actor.id == interaction.user.id
+        actor = await self.bot.get_actor(
+            interaction.guild, interaction.user.id
         ) or self.bot.create_actor(member)
         return [
             app_commands.Choice(
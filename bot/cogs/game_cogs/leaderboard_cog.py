@@ -1,3 +1,4 @@
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from discord import Color, Embed, Guild, Interaction, Member, User, app_commands
@@ -8,6 +9,7 @@ from odmantic import query
 from bot.main import ActBot
 from bot.ui.embed import EmbedX
 from db.actor import Actor
+from db.xp_gain import XpGain
 
 
 # ----------------------------------------------------------------------------------------------------
@@ -48,6 +50,50 @@ class LeaderboardCog(
             ),
         )
 
+    @app_commands.guild_only()
+    @app_commands.command(description="View top members by xp gained in last hours")
+    @app_commands.describe(hours="Number of last hours (up to a week)")
+    async def xp(
+        self,
+        interaction: Interaction,
+        hours: app_commands.Range[int, 1, XpGain.TTL // 3600] = 24,
+    ):
+        # Check guild
+        guild = interaction.guild
+        if not guild:
+            await interaction.response.send_message(
+                embed=EmbedX.warning("This command cannot be used in this context."),
+                ephemeral=True,
+            )
+            return
+
+        # Get top gainers
+        await interaction.response.defer()
+        db = await self.bot.get_db(guild)
+        user_gains = await XpGain.totals(
+            db, since=datetime.now(UTC) - timedelta(hours=hours), limit=10
+        )
+        if not user_gains:
+            await interaction.followup.send(
+                embed=EmbedX.warning(description=f"No xp gained in last {hours} hours.")
+            )
+            return
+
+        # Create board table
+        names_column_text = ""
+        for i, (user_id, total_xp) in enumerate(user_gains):
+            xp = naturalsize(total_xp, binary=False, gnu=True).replace("B", "")
+            medal = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else ""
+            names_column_text += (
+                f"**# {(i+1)}** ― {medal} <@{user_id}>\n**`⏫+{xp}`**\n\n"
+            )
+
+        # Send embed
+        embed = EmbedX.info(emoji="⏫", title=f"XP Leaderboard ({hours} hr)")
+        embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
+        embed.add_field(name="", value=names_column_text)
+        await interaction.followup.send(embed=embed)
+
     # ----------------------------------------------------------------------------------------------------
 
     async def show_leaderboard(
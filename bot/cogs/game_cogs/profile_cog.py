@@ -161,8 +161,8 @@ class ProfileCog(
         await interaction.response.defer()
 
         # Get actor
-        actor = self.bot.get_db(member.guild).find_one(
-            Actor, Actor.id == member.id
+        actor = await self.bot.get_actor(
+            member.guild, member.id
         ) or self.bot.create_actor(member)
 
         # Create embed
@@ -0,0 +1,158 @@
+from collections import deque
+
+from discord import Embed, Member, Message
+from discord.abc import Messageable
+from pydantic import BaseModel
+
+from utils.cache import ActCache
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Channel Message
+# ----------------------------------------------------------------------------------------------------
+class ChannelMessage(BaseModel):
+    """Compact copy of a channel message, keeping only what channel context needs."""
+
+    id: int
+    author_id: int
+    author_name: str
+    author_display_name: str
+    author_is_bot: bool = False
+    author_is_member: bool = False  # Guild member (not DM user)
+    content: str = ""
+    embed: str = ""  # Summary of first embed, if any
+
+    @classmethod
+    def from_message(cls, message: Message) -> "ChannelMessage":
+        author = message.author
+        return cls(
+            id=message.id,
+            author_id=author.id,
+            author_name=author.name,
+            author_display_name=author.display_name,
+            author_is_bot=author.bot,
+            author_is_member=isinstance(author, Member),
+            content=message.content,
+            embed=cls.format_embed(message.embeds[0]) if message.embeds else "",
+        )
+
+    @staticmethod
+    def format_embed(embed: Embed) -> str:
+        parts = []
+        if embed.title:
+            parts.append(f"Title: {embed.title}")
+        if embed.description:
+            parts.append(f"Description: {embed.description}")
+        if embed.author and embed.author.name:
+            parts.append(f"Author: {embed.author.name}")
+        for field in embed.fields:
+            parts.append(f"Field '{field.name}': {field.value}")
+        if embed.footer and embed.footer.text:
+            parts.append(f"Footer: {embed.footer.text}")
+        if embed.image and embed.image.url:
+            parts.append(f"Image URL: {embed.image.url}")
+        if embed.thumbnail and embed.thumbnail.url:
+            parts.append(f"Thumbnail URL: {embed.thumbnail.url}")
+        if embed.url:
+            parts.append(f"URL: {embed.url}")
+        return f"{{ {'; '.join(parts)} }}"
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Channel History
+# ----------------------------------------------------------------------------------------------------
+class ChannelHistory:
+    """In-memory ring buffers of latest messages (compact copies) per channel, kept up to date by gateway events.
+    A channel buffer is only created (warmed) from a REST history fetch, so it never misses older messages.
+    Gateway events received while warming are merged into fetched messages, so they are not missed either.
+    """
+
+    def __init__(self, max_messages: int = 300, max_channels: int = 1024):
+        """
+        :param int max_messages: Maximum number of latest messages kept per channel.
+        :param int max_channels: Maximum number of channels kept. Least recently used channels are dropped first.
+        """
+        self.max_messages = max_messages
+        self._buffers: ActCache[int, deque[ChannelMessage]] = ActCache(max_channels)
+        # Channel id -> message id -> message added or edited (None if deleted) while warming
+        self._warming: dict[int, dict[int, ChannelMessage | None]] = {}
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._buffers
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def get(self, channel_id: int) -> list[ChannelMessage] | None:
+        """Get latest messages (newest first) of given channel. If cold, get None."""
+        buffer = self._buffers.get(channel_id)
+        return list(reversed(buffer)) if buffer is not None else None
+
+    def last(self, channel_id: int) -> ChannelMessage | None:
+        """Get latest message of given channel. If cold or empty, get None."""
+        buffer = self._buffers.get(channel_id)
+        return buffer[-1] if buffer else None
+
+    async def fetch(self, channel: Messageable) -> list[ChannelMessage]:
+        """Get latest messages (newest first) of given channel. If cold, warm it up from REST history."""
+        channel_id: int = channel.id  # type: ignore
+        messages = self.get(channel_id)
+        if messages is not None:
+            return messages
+        events = self._warming.setdefault(channel_id, {})
+        try:
+            fetched_messages = {
+                message.id: ChannelMessage.from_message(message)
+                async for message in channel.history(limit=self.max_messages)
+            }
+        finally:
+            if self._warming.get(channel_id) is events:
+                del self._warming[channel_id]
+        if channel_id in self._buffers:  # Warmed meanwhile
+            return self.get(channel_id)  # type: ignore
+        for message_id, message in events.items():
+            if message:
+                fetched_messages[message_id] = message
+            else:
+                fetched_messages.pop(message_id, None)
+        buffer = deque(
+            sorted(fetched_messages.values(), key=lambda message: message.id),
+            maxlen=self.max_messages,
+        )
+        self._buffers.set(channel_id, buffer)
+        return list(reversed(buffer))
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def add(self, message: Message):
+        """Add given new message to its channel buffer, if warm (or warming)."""
+        channel_id = message.channel.id
+        buffer = self._buffers.get(channel_id)
+        if buffer is not None:
+            buffer.append(ChannelMessage.from_message(message))
+        elif (events := self._warming.get(channel_id)) is not None:
+            events[message.id] = ChannelMessage.from_message(message)
+
+    def edit(self, message: Message):
+        """Replace given edited message in its channel buffer, if present (or warming)."""
+        channel_id = message.channel.id
+        buffer = self._buffers.get(channel_id)
+        if buffer is None:
+            if (events := self._warming.get(channel_id)) is not None:
+                events[message.id] = ChannelMessage.from_message(message)
+            return
+        for i, buffered_message in enumerate(buffer):
+            if buffered_message.id == message.id:
+                buffer[i] = ChannelMessage.from_message(message)
+                break
+
+    def delete(self, channel_id: int, message_id: int):
+        """Remove message of given id from given channel buffer, if present (or warming)."""
+        buffer = self._buffers.get(channel_id)
+        if buffer is None:
+            if (events := self._warming.get(channel_id)) is not None:
+                events[message_id] = None
+            return
+        for buffered_message in buffer:
+            if buffered_message.id == message_id:
+                buffer.remove(buffered_message)
+                break
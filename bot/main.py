@@ -15,12 +15,14 @@ from discord import (
 )
 from discord.abc import Messageable
 from discord.ext.commands import Bot, Cog
-from odmantic import SyncEngine, query
+from odmantic import AIOEngine, query
+from pymongo import UpdateOne
 
 from bot.ui.embed import EmbedX
 from db.actor import Actor, DmActor
 from db.main import ActDb, DbRef
 from db.room import Room
+from utils.cache import ActCache
 from utils.log import logger
 from utils.misc import import_classes, text_block
 
@@ -31,6 +33,9 @@ log = logger(__name__)
 # * Act Bot
 # ----------------------------------------------------------------------------------------------------
 class ActBot(Bot):
+    ACTORS_CACHE_MAX = 4096  # Cached actors across all guilds
+    ACTORS_CACHE_TTL = 300.0  # sec
+
     def __init__(
         self,
         *args,
@@ -49,6 +54,9 @@ class ActBot(Bot):
         self.title = title
         self.version = version
         self.description = description
+        self.actors_cache: ActCache[tuple[int, int], Actor] = ActCache(
+            self.ACTORS_CACHE_MAX, self.ACTORS_CACHE_TTL
+        )
         self.tree.error(self.on_error)
 
     async def setup_hook(self):
@@ -195,18 +203,22 @@ class ActBot(Bot):
 
     # ----------------------------------------------------------------------------------------------------
 
-    def get_db(self, guild: Guild | None = None) -> SyncEngine:
-        """Get database engine with database of given guild. If no guild, get engine with main database. If nonexistent, create."""
+    async def get_db(self, guild: Guild | None = None) -> AIOEngine:
+        """Get async database engine with database of given guild. If no guild, get engine with main database. If nonexistent, create."""
         if self._db:
             db = (
-                self._db.get_engine(guild.id, guild.name)
+                await self._db.get_aio_engine(guild.id, guild.name)
                 if guild
-                else self._db.get_engine()
+                else await self._db.get_aio_engine()
             )
             if db:
                 return db
         raise ValueError("Missing database.")
 
+    def get_db_name(self, guild: Guild) -> str | None:
+        """Get database name of given guild from preloaded registry. If nonexistent, get None."""
+        return self._db.get_db_name(guild.id) if self._db else None
+
     def create_db_ref(self, guild: Guild) -> DbRef:
         """Get database reference of given guild. If nonexistent, create."""
         return DbRef(id=guild.id, name=guild.name)
@@ -232,6 +244,57 @@ class ActBot(Bot):
 
     # ----------------------------------------------------------------------------------------------------
 
+    async def get_actor(self, guild: Guild, id: int) -> Actor | None:
+        """Get actor of given id in given guild from cache, or from database if not cached. If nonexistent, get None.
+        Each call gets its own copy, so changes are shared only once saved."""
+        key = (guild.id, id)
+        actor = self.actors_cache.get(key)
+        if not actor:
+            db = await self.get_db(guild)
+            actor = await db.find_one(Actor, Actor.id == id)
+            if not actor:
+                return None
+            self.actors_cache.set(key, actor)
+        return self._copy_actor(actor)
+
+    async def save_actors(self, guild: Guild, *actors: Actor):
+        """Save changes of given actors of given guild to database (as minimal partial updates) and uncache them,
+        so next get reloads them with all concurrent changes."""
+        requests: list[UpdateOne] = []
+        docs: list[dict[str, Any]] = []
+        for actor in actors:
+            updates, doc = actor.update_docs()
+            docs.append(doc)
+            requests += [
+                UpdateOne({"_id": actor.id}, update, upsert=True) for update in updates
+            ]
+        if requests:
+            db = await self.get_db(guild)
+            # Ordered, as updates of a new actor apply on its insert
+            await db.get_collection(Actor).bulk_write(requests)
+        for actor, doc in zip(actors, docs):
+            actor.mark_persisted(doc)
+            object.__setattr__(actor, "__fields_modified__", set())
+        self.uncache_actors(guild, *(actor.id for actor in actors))
+
+    def uncache_actors(self, guild: Guild | int, *ids: int):
+        """Remove actors of given ids in given guild from cache. If no ids, remove all actors of given guild."""
+        guild_id = guild if isinstance(guild, int) else guild.id
+        keys = [(guild_id, id) for id in ids] or [
+            key for key in self.actors_cache.keys() if key[0] == guild_id
+        ]
+        for key in keys:
+            self.actors_cache.pop(key)
+
+    @staticmethod
+    def _copy_actor(actor: Actor) -> Actor:
+        """Get deep copy of given actor keeping its modified fields (so saves stay partial)."""
+        copy = actor.model_copy(deep=True)
+        object.__setattr__(copy, "__fields_modified__", set(actor.__fields_modified__))
+        return copy
+
+    # ----------------------------------------------------------------------------------------------------
+
     async def get_actors_members(
         self,
         guild: Guild,
@@ -243,8 +306,8 @@ class ActBot(Bot):
         ),
     ) -> list[tuple[Actor, Member]]:
         """Get actors with their associated members."""
-        db = self.get_db(guild)
-        actors = (
+        db = await self.get_db(guild)
+        actors = await (
             db.find(
                 Actor,
                 Actor.is_member == True,
@@ -0,0 +1,48 @@
+from time import monotonic
+
+from discord import Message
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Stream Reply
+# ----------------------------------------------------------------------------------------------------
+class StreamReply:
+    """Reply to a message that is posted on first streamed text, then progressively edited as more text streams in.
+    Edits are throttled to stay within Discord message edit rate limits (5 per 5 sec per channel).
+    """
+
+    EDIT_INTERVAL = 1.5  # sec
+
+    def __init__(self, message: Message, edit_interval: float | None = None):
+        self.message = message
+        self.reply: Message | None = None
+        self.edit_interval = edit_interval or self.EDIT_INTERVAL
+        self._text = ""  # Latest text
+        self._shown_text = ""  # Text shown in reply
+        self._edited_at = 0.0
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def update(self, text: str | None):
+        """Show given text so far. Post reply if not yet, or edit it if edit interval elapsed."""
+        self._text = text or ""
+        if not self._text.strip() or self._text == self._shown_text:
+            return
+        if not self.reply or monotonic() - self._edited_at >= self.edit_interval:
+            await self._show()
+
+    async def finish(self, text: str | None = None) -> Message | None:
+        """Show given final text (or latest text) right away. Get reply message."""
+        if text:
+            self._text = text
+        if self._text.strip() and self._text != self._shown_text:
+            await self._show()
+        return self.reply
+
+    async def _show(self):
+        if self.reply:
+            await self.reply.edit(content=self._text)
+        else:
+            self.reply = await self.message.reply(self._text)
+        self._shown_text = self._text
+        self._edited_at = monotonic()
@@ -0,0 +1,236 @@
+from asyncio import Lock, Semaphore, TaskGroup
+from datetime import UTC, datetime
+from typing import Awaitable, Callable
+
+from discord import Guild, Message, Object, TextChannel
+from discord.utils import time_snowflake
+from odmantic import AIOEngine, query
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db.actor import Actor
+from db.xp_backfill import XpBackfillCheckpoint
+from utils.log import logger
+from utils.xp import Experience
+
+log = logger(__name__)
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Xp Backfill
+# ----------------------------------------------------------------------------------------------------
+class XpBackfill:
+    """Resumable pipeline (re)computing actors xp of a guild from its channel history.
+    Channels are streamed concurrently, messages scored in batches & summed per actor, then totals are applied
+    to actors (with level-ups & their gold rewards) in bulk writes. Progress is checkpointed in guild database.
+    """
+
+    CHANNEL_CONCURRENCY = 3  # Channels streamed at once
+    SCORE_BATCH_SIZE = 1000  # Messages scored at once
+    CHECKPOINT_INTERVAL = 5000  # Messages scored between checkpoints
+    WRITE_BATCH_SIZE = 1000  # Actors per bulk write
+    RUN_FIELD = "xp_backfill_id"  # Actor field marking it applied by backfill run (of its before id)
+
+    def __init__(
+        self,
+        db: AIOEngine,
+        guild: Guild,
+        on_progress: Callable[[XpBackfillCheckpoint], Awaitable[None]] | None = None,
+    ):
+        self.db = db
+        self.guild = guild
+        self.on_progress = on_progress
+        self.checkpoint: XpBackfillCheckpoint | None = None
+        self._checkpoint_lock = Lock()
+        self._scored_count = 0  # Since last checkpoint
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def load(self) -> XpBackfillCheckpoint | None:
+        """Load checkpoint of interrupted backfill of guild. If none, get None."""
+        self.checkpoint = await self.db.find_one(XpBackfillCheckpoint)
+        return self.checkpoint
+
+    async def discard(self):
+        """Delete checkpoint of interrupted backfill of guild, if any."""
+        await self.db.get_collection(XpBackfillCheckpoint).delete_many({})
+        self.checkpoint = None
+
+    async def run(
+        self, channels: list[TextChannel] | None = None, is_reset: bool = False
+    ) -> XpBackfillCheckpoint:
+        """Backfill xp from given channels history (all readable text channels by default). If reset, replace
+        actors xp with backfilled xp, else add it. If interrupted backfill loaded, resume it instead. Get final progress.
+        """
+        if not self.checkpoint:
+            channels = channels or [
+                channel
+                for channel in self.guild.text_channels
+                if channel.permissions_for(self.guild.me).read_message_history
+            ]
+            self.checkpoint = XpBackfillCheckpoint(
+                is_reset=is_reset,
+                before_id=time_snowflake(datetime.now(UTC)),
+                channel_ids=[channel.id for channel in channels],
+            )
+            await self.save_checkpoint()
+        checkpoint = self.checkpoint
+
+        # Scan channels (If one fails, others are cancelled)
+        semaphore = Semaphore(self.CHANNEL_CONCURRENCY)
+
+        async def scan(channel_id: int):
+            async with semaphore:
+                await self.scan_channel(channel_id)
+
+        async with TaskGroup() as task_group:
+            for channel_id in checkpoint.channel_ids:
+                if channel_id not in checkpoint.done_channel_ids:
+                    task_group.create_task(scan(channel_id))
+        await self.save_checkpoint()
+
+        # Apply totals
+        await self.apply()
+        await self.discard()
+        return checkpoint
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def scan_channel(self, channel_id: int):
+        """Score history of channel of given id since its cursor, checkpointing along."""
+        checkpoint = self.checkpoint
+        assert checkpoint
+        channel = self.guild.get_channel(channel_id)
+        if isinstance(channel, TextChannel):
+            cursor = checkpoint.cursors.get(str(channel_id))
+            batch: list[Message] = []
+            last_id = cursor
+            async for message in channel.history(
+                limit=None,
+                after=Object(cursor) if cursor else None,
+                before=Object(checkpoint.before_id),
+                oldest_first=True,
+            ):
+                last_id = message.id
+                if not message.author.bot:
+                    batch.append(message)
+                if len(batch) >= self.SCORE_BATCH_SIZE:
+                    await self.score(channel_id, batch, last_id)
+                    batch = []
+            await self.score(channel_id, batch, last_id)
+        else:
+            log.warning(f"[{self.guild.name}] Channel {channel_id} not found, skipped.")
+        checkpoint.done_channel_ids.append(channel_id)
+
+    async def score(
+        self, channel_id: int, messages: list[Message], last_id: int | None
+    ):
+        """Add xp of given messages to actors totals and move channel cursor to given last scanned message id."""
+        checkpoint = self.checkpoint
+        assert checkpoint
+        rewards = Experience.calculate_rewards(
+            (
+                message.content,
+                len(message.attachments),
+                len(message.embeds),
+                len(message.stickers),
+            )
+            for message in messages
+        )
+        for message, xp in zip(messages, rewards):
+            key = str(message.author.id)
+            checkpoint.xp_totals[key] = checkpoint.xp_totals.get(key, 0) + xp
+            if key not in checkpoint.names:
+                checkpoint.names[key] = [
+                    message.author.name,
+                    message.author.display_name,
+                ]
+        checkpoint.messages_count += len(messages)
+        if last_id:
+            checkpoint.cursors[str(channel_id)] = last_id
+        self._scored_count += len(messages)
+        if self._scored_count >= self.CHECKPOINT_INTERVAL:
+            await self.save_checkpoint()
+
+    async def apply(self):
+        """Write backfilled xp totals to actors (in ascending id order, from last written), levelling them up.
+        Each actor is marked with backfill run while written, so a batch written but not checkpointed (interrupted)
+        is not applied twice on resume."""
+        checkpoint = self.checkpoint
+        assert checkpoint
+        actor_ids = sorted(int(key) for key in checkpoint.xp_totals)
+        collection = self.db.get_collection(Actor)
+        for i in range(checkpoint.applied_count, len(actor_ids), self.WRITE_BATCH_SIZE):
+            ids = actor_ids[i : i + self.WRITE_BATCH_SIZE]
+            actors = {
+                actor.id: actor
+                for actor in await self.db.find(Actor, query.in_(Actor.id, ids))
+            }
+            requests = [
+                self._update_request(
+                    actors.get(id),
+                    id,
+                    checkpoint.xp_totals[str(id)],
+                    checkpoint.is_reset,
+                )
+                for id in ids
+            ]
+            try:
+                await collection.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate key errors are upserts of actors already marked (applied)
+                if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                    raise
+            checkpoint.applied_count = i + len(ids)
+            await self.save_checkpoint()
+        await collection.update_many(
+            {self.RUN_FIELD: checkpoint.before_id}, {"$unset": {self.RUN_FIELD: ""}}
+        )
+
+    def _update_request(
+        self, actor: Actor | None, id: int, xp: int, is_reset: bool
+    ) -> UpdateOne:
+        """Get upsert request applying given backfilled xp to given actor (or new actor of given id), with level-ups
+        & their gold rewards."""
+        is_new = actor is None
+        if not actor:
+            name, display_name = self.checkpoint.names.get(str(id), ["", ""])  # type: ignore
+            actor = Actor(
+                id=id,
+                name=name,
+                display_name=display_name,
+                is_member=self.guild.get_member(id) is not None,
+            )
+        old_level = actor.level
+        xp_change = xp - actor.xp if is_reset else xp
+        actor.xp += xp_change
+        if is_reset:
+            actor.level = 0
+        actor.try_level_up()
+        gold = Actor.levels_gold(old_level, actor.level)  # Only newly reached levels
+        update: dict = {
+            "$inc": {"xp": xp_change, "gold": gold},
+            "$set": {self.RUN_FIELD: self.checkpoint.before_id},  # type: ignore
+        }
+        update.setdefault("$set" if is_reset else "$max", {})["level"] = actor.level
+        if is_new:
+            doc = actor.model_dump_doc()
+            for field in ("_id", "xp", "gold", "level"):
+                doc.pop(field, None)
+            update["$setOnInsert"] = doc
+        return UpdateOne(
+            {"_id": id, self.RUN_FIELD: {"$ne": self.checkpoint.before_id}},  # type: ignore
+            update,
+            upsert=True,
+        )
+
+    async def save_checkpoint(self):
+        """Save progress to guild database & report it."""
+        checkpoint = self.checkpoint
+        assert checkpoint
+        async with self._checkpoint_lock:
+            self._scored_count = 0
+            checkpoint.updated_at = datetime.now(UTC)
+            await self.db.save(checkpoint)
+        if self.on_progress:
+            await self.on_progress(checkpoint)
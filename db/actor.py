@@ -1,7 +1,9 @@
+from bisect import bisect_right
 from datetime import datetime, timedelta, timezone
-from typing import Any, ClassVar, Optional, cast
+from functools import cache
+from typing import Any, ClassVar, Optional, Self, cast
 
-from odmantic import Field, Model
+from odmantic import Field, Index, Model, query
 from pydantic import NonNegativeFloat, NonNegativeInt
 
 from db.item import Item, ItemStack
@@ -10,6 +12,28 @@ from db.rank import Rank
 from utils.misc import clamp, scaled_power, text_progress_bar
 
 
+@cache
+def build_level_xp_table(
+    level_xp_base: float, level_exponent: float, level_max: int
+) -> tuple[int, ...]:
+    """Get xp thresholds of levels 0 to given max level, on given power curve."""
+    return tuple(
+        int(scaled_power(level, level_xp_base, level_exponent))
+        for level in range(level_max + 1)
+    )
+
+
+@cache
+def build_rank_elo_thresholds(
+    elo_base: int, elo_growth_rate: int, ranks_count: int
+) -> tuple[int, ...]:
+    """Get minimum elo of ranks 0 to given count, on given linear curve (First rank from 0 elo)."""
+    return tuple(
+        elo_base + (rank_index - 1) * elo_growth_rate if rank_index != 0 else 0
+        for rank_index in range(ranks_count)
+    )
+
+
 # -------------------------------------------------------------------------------------------------
 # * DM Actor
 # -------------------------------------------------------------------------------------------------
@@ -22,14 +46,34 @@ class DmActor(Model):
 
     # AI
     ai_interacted_at: Optional[datetime] = None
-    ai_chat_history: list[dict[str, Any]] = []
 
 
 # -------------------------------------------------------------------------------------------------
 # * Actor
 # -------------------------------------------------------------------------------------------------
 class Actor(Model):
-    model_config = {"collection": "actors"}
+    model_config = {
+        "collection": "actors",
+        "indexes": lambda: [
+            Index(  # Level leaderboard
+                Actor.is_member,
+                query.desc(Actor.level),
+                query.desc(Actor.xp),
+                query.desc(Actor.gold),
+                name="is_member_level_xp_gold",
+            ),
+            Index(  # Rank leaderboard
+                Actor.is_member,
+                query.desc(Actor.elo),
+                query.desc(Actor.gold),
+                name="is_member_elo_gold",
+            ),
+            Index(  # Recent AI interactions
+                query.desc(Actor.ai_interacted_at),
+                name="ai_interacted_at",
+            ),
+        ],
+    }
 
     # Membership
     id: int = Field(primary_field=True)
@@ -99,6 +143,11 @@ class Actor(Model):
     RANKS: ClassVar[list[Rank]] = ActToml.load_list(Rank)
     RANK_MAX: ClassVar[NonNegativeInt] = len(RANKS) - 1
 
+    # Persistence
+    INC_FIELDS: ClassVar[frozenset[str]] = frozenset(
+        {"gold", "xp", "elo", "wins", "losses"}
+    )  # Counters saved as relative changes, so concurrent updates are not lost
+
     # ----------------------------------------------------------------------------------------------------
 
     @property
@@ -158,18 +207,31 @@ class Actor(Model):
 
     # -------------------------------------------------------------------------------------------------
 
-    def try_level_up(self) -> bool:
-        """Check if player has enough xp to level up and increment level if so."""
+    def try_level_up(self) -> int:
+        """Raise level to highest level reached by current xp, at once. Get number of levels gained."""
         initial_level = self.level
-        while self.xp >= self.next_level_xp and self.level < self.LEVEL_MAX:
-            self.level += 1
-        return self.level > initial_level
+        self.level = max(self.level, self.xp_level(self.xp))
+        return self.level - initial_level
+
+    @classmethod
+    def level_xp_table(cls) -> tuple[int, ...]:
+        """Get xp required to reach each level, from 0 to max level (built once)."""
+        return build_level_xp_table(
+            cls.LEVEL_XP_BASE, cls.LEVEL_EXPONENT, cls.LEVEL_MAX
+        )
 
     @classmethod
     def level_xp(cls, level: int):
         """Calculate xp required to reach given level."""
+        if 0 <= level <= cls.LEVEL_MAX:
+            return cls.level_xp_table()[level]
         return int(scaled_power(level, cls.LEVEL_XP_BASE, cls.LEVEL_EXPONENT))
 
+    @classmethod
+    def xp_level(cls, xp: int) -> int:
+        """Get highest level reached by given xp (up to max level)."""
+        return max(0, bisect_right(cls.level_xp_table(), xp) - 1)
+
     @property
     def next_level_xp(self) -> int:
         """Calculate xp required to reach next level."""
@@ -189,13 +251,30 @@ class Actor(Model):
 
     @property
     def rank(self) -> Rank | None:
-        """Get current rank or None if unranked."""
-        if self.duels < self.PLACEMENT_DUELS_MAX:
-            return None
-        for i in range(len(self.RANKS) - 1, -1, -1):  # Reverse to check highest first
-            if self.elo >= self.rank_elo(i):
-                return self.RANKS[i]
-        return self.RANKS[0]
+        """Get current rank or None if unranked (Memoized until elo, wins or losses change)."""
+        key = (self.elo, self.wins, self.losses)
+        memo: tuple[tuple[int, int, int], Rank | None] | None = self.__dict__.get(
+            "__rank__"
+        )
+        if memo and memo[0] == key:
+            return memo[1]
+        rank = None
+        if self.duels >= self.PLACEMENT_DUELS_MAX:
+            rank = self.RANKS[self.elo_rank_index(self.elo)]
+        object.__setattr__(self, "__rank__", (key, rank))
+        return rank
+
+    @classmethod
+    def rank_elo_thresholds(cls) -> tuple[int, ...]:
+        """Get minimum elo of each rank, in rank order (built once)."""
+        return build_rank_elo_thresholds(
+            cls.ELO_BASE, cls.ELO_GROWTH_RATE, len(cls.RANKS)
+        )
+
+    @classmethod
+    def elo_rank_index(cls, elo: int) -> int:
+        """Get index of highest rank reached by given elo."""
+        return max(0, bisect_right(cls.rank_elo_thresholds(), elo) - 1)
 
     def expected_score(self, opponent_elo: int) -> float:
         """Calculate expected score against given opponent."""
@@ -221,6 +300,16 @@ class Actor(Model):
             else 0
         )
 
+    @classmethod
+    def levels_gold(cls, from_level: int, to_level: int) -> int:
+        """Calculate total gold reward for reaching each level above given level up to given level."""
+        from_level = max(0, from_level)
+        if to_level <= from_level:
+            return 0
+        count = to_level - from_level
+        levels_sum = (from_level + 1 + to_level) * count // 2
+        return cls.GOLD_REWARD_BASE * count + cls.GOLD_REWARD_PER_LEVEL * levels_sum
+
     @property
     def current_level_gold(self) -> int:
         """Calculate gold reward for reaching current level."""
@@ -308,3 +397,56 @@ class Actor(Model):
             )
             lines.append((rank, elo))
         return lines
+
+    # -------------------------------------------------------------------------------------------------
+
+    @classmethod
+    def model_validate_doc(cls, raw_doc: dict[str, Any]) -> Self:
+        # Explicit base call, as odmantic model metaclass does not support zero-argument super()
+        actor = Model.model_validate_doc.__func__(cls, raw_doc)
+        # Track changes from stored values (Fields missing in them are set on next save)
+        actor.mark_persisted(raw_doc)
+        return actor
+
+    def mark_persisted(self, doc: dict[str, Any] | None = None):
+        """Mark given document (if none, current state) as stored in database, to track changes from."""
+        object.__setattr__(
+            self, "__persisted__", doc if doc is not None else self.model_dump_doc()
+        )
+
+    def update_docs(self) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """Get (updates, doc) tuple of minimal updates ($inc for counters, $set for others) of changes since last
+        persisted, to apply in order, and current document.
+        If never persisted, first update inserts a default actor unless stored meanwhile (e.g. by xp buffer), then changes
+        from default are applied (level raised only), so concurrent changes are not overwritten.
+        """
+        doc = self.model_dump_doc()
+        persisted: dict[str, Any] | None = self.__dict__.get("__persisted__")
+        is_new = persisted is None
+        updates = []
+        if persisted is None:
+            persisted = type(self)(id=self.id).model_dump_doc()
+            updates.append(
+                {"$setOnInsert": {k: v for k, v in persisted.items() if k != "_id"}}
+            )
+        increments, assignments, maximums = {}, {}, {}
+        for key, value in doc.items():
+            old_value = persisted.get(key)
+            if key == "_id" or value == old_value:
+                continue
+            if key in self.INC_FIELDS and old_value is not None:
+                increments[key] = value - old_value
+            elif key == "level" and is_new:
+                maximums[key] = value
+            else:
+                assignments[key] = value
+        update = {}
+        if increments:
+            update["$inc"] = increments
+        if assignments:
+            update["$set"] = assignments
+        if maximums:
+            update["$max"] = maximums
+        if update:
+            updates.append(update)
+        return updates, doc
@@ -0,0 +1,42 @@
+from datetime import UTC, datetime
+from typing import Any
+
+from odmantic import Field, Index, Model, query
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Chat Turn
+# ----------------------------------------------------------------------------------------------------
+class ChatTurn(Model):
+    """Database model for storage of one content of an AI chat session history (append-only)."""
+
+    model_config = {
+        "collection": "ai_chat_turns",
+        "indexes": lambda: [
+            Index(
+                ChatTurn.session_id,
+                query.desc(ChatTurn.seq),
+                unique=True,
+                name="session_id_seq",
+            )
+        ],
+    }
+
+    session_id: int  # Guild id or user id (DM)
+    seq: int  # Position in session history, increasing
+    content: dict[str, Any]
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Chat Summary
+# ----------------------------------------------------------------------------------------------------
+class ChatSummary(Model):
+    """Database model for storage of rolling summary of older contents of an AI chat session history."""
+
+    model_config = {"collection": "ai_chat_summaries"}
+
+    id: int = Field(primary_field=True)  # Session id
+    text: str
+    seq: int  # Last summarized content position in session history
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
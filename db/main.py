@@ -5,11 +5,13 @@ from pathlib import Path
 from typing import Any, Self, Type, TypeVar
 
 from colorama import Fore
-from odmantic import Field, Model, SyncEngine
+from motor.motor_asyncio import AsyncIOMotorClient
+from odmantic import AIOEngine, Field, Model, SyncEngine
 from pydantic import BaseModel
 from pymongo import MongoClient
 from pymongo.database import Database
 
+from utils.cache import ActCache
 from utils.log import logger
 from utils.misc import text_block
 
@@ -77,36 +79,49 @@ class DbRef(Model):
 
     id: int = Field(primary_field=True)
     name: str
-    ai_chat_history: list[dict[str, Any]] = []
 
 
 # ----------------------------------------------------------------------------------------------------
 # * Act Database
 # ----------------------------------------------------------------------------------------------------
 class ActDb:
-    """Database interface for access and management of multiple related databases."""
+    """Database interface for access and management of multiple related databases.
+    Async engines (non-blocking) are meant for the event loop, sync engines for scripts.
+    """
+
+    ENGINES_MAX = 1024  # Cached engines per kind (sync/async), roughly one per guild
 
     # ----------------------------------------------------------------------------------------------------
 
-    def __init__(self, name: str, *args, **kwargs):
+    def __init__(
+        self, name: str, *args, models: list[Type[Model]] | None = None, **kwargs
+    ):
         """
         :param str name: Name of main database and prefix for all names of related databases.
+        :param list models: Models whose indexes are ensured in each related database when first opened.
         :param *args: Any MongoClient constructor positional arguments.
         :param **kwargs: Any MongoClient constructor keyword arguments.
         """
         self.name = name or ActDb.__name__
-        self.db_refs: dict[int, DbRef] = {}
+        self.models = models or []
+        # Registry of database references (id → name), loaded at once and written through
+        self.db_names: dict[int, str] = {}
+        self._db_names_taken: set[str] = set()
+        self._configured_db_names: set[str] = set()
         log.loading(f"Database client opening...")
-        self._engine = SyncEngine(MongoClient(*args, **kwargs), self.name)
-        self._main_database = self._engine.database
-        host, port = self._engine.client.address or ("?", "?")
+        self._client = MongoClient(*args, **kwargs)
+        self._aio_client = AsyncIOMotorClient(*args, **kwargs)
+        self._engines: ActCache[str, SyncEngine] = ActCache(self.ENGINES_MAX)
+        self._aio_engines: ActCache[str, AIOEngine] = ActCache(self.ENGINES_MAX)
+        host, port = self._client.address or ("?", "?")
         log.success(f"🍃 Database client connected to {host}:{port}.")
         # log.info("\n" + self.info_text)
+        self.load_db_refs()
 
     @property
     def info_text(self):
         output = "Databases:"
-        for db_name in self._engine.client.list_database_names():
+        for db_name in self._client.list_database_names():
             if db_name == self.name:
                 db_name = f"{Fore.CYAN}{db_name}{Fore.RESET}"
             elif db_name == "admin" or "config" or "local":
@@ -117,14 +132,63 @@ class ActDb:
     # ----------------------------------------------------------------------------------------------------
 
     def _get_engine(self, database: Database | str | None = None) -> SyncEngine:
-        """Get engine with database of given instance or name. If none, get engine with main database."""
-        if isinstance(database, Database):
-            self._engine.database = database
-        elif database and isinstance(database, str):
-            self._engine.database = self._engine.client.get_database(database)
-        else:
-            self._engine.database = self._main_database
-        return self._engine
+        """Get engine bound to database of given instance or name. If none, get engine with main database.
+        Engines are cached per database and never rebound, so they are safe to share across tasks and threads.
+        """
+        name = (
+            database.name if isinstance(database, Database) else database
+        ) or self.name
+        return self._engines.get(name) or self._engines.set(
+            name, SyncEngine(self._client, name)
+        )
+
+    def _get_aio_engine(self, database: str | None = None) -> AIOEngine:
+        """Get async engine bound to database of given name. If none, get async engine with main database."""
+        name = database or self.name
+        return self._aio_engines.get(name) or self._aio_engines.set(
+            name, AIOEngine(self._aio_client, name)
+        )
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def _format_db_name(self, name: str) -> str:
+        """Get valid prefixed database name from given name."""
+        return f"{self.name}_{re.sub(r"[^a-zA-Z0-9_-]", "_", name).lower()}"
+
+    @staticmethod
+    def _dedupe_db_name(id: int, name: str) -> str:
+        """Get database name with appended id-based hash to ensure it's different and unique."""
+        return f"{name}_{hashlib.sha256(str(id).encode()).hexdigest()[:8]}"
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def load_db_refs(self):
+        """Load registry of all database references from main database at once."""
+        collection = self._get_engine().get_collection(DbRef)
+        for doc in collection.find({}, {"name": True}):
+            self._register_db_name(doc["_id"], doc["name"])
+        log.info(f"{len(self.db_names)} database reference(s) loaded.")
+
+    def get_db_name(self, id: int) -> str | None:
+        """Get database name of given id from registry. If nonexistent, get None."""
+        return self.db_names.get(id)
+
+    def _register_db_name(self, id: int, db_name: str):
+        self.db_names[id] = db_name
+        self._db_names_taken.add(db_name)
+
+    def _unregister_db_name(self, id: int, db_name: str):
+        if self.db_names.get(id) == db_name:
+            del self.db_names[id]
+        self._db_names_taken.discard(db_name)
+
+    def _create_db_name(self, id: int, name: str) -> str:
+        """Get new unique database name for given id & name, and register it (reserved until its reference is saved)."""
+        db_name = self._format_db_name(name)
+        if db_name in self._db_names_taken:
+            db_name = self._dedupe_db_name(id, db_name)
+        self._register_db_name(id, db_name)
+        return db_name
 
     # ----------------------------------------------------------------------------------------------------
 
@@ -135,23 +199,51 @@ class ActDb:
         If nonexistent, create database with given name, if no name, return None."""
         if id is None:
             return self._get_engine()
-        db_ref = self.db_refs.get(id) or self._get_engine().find_one(
-            DbRef, DbRef.id == id
-        )  # Get reference from memory cache or main database
-        if not db_ref and name:
-            # Generate valid unique database name
-            name = re.sub(r"[^a-zA-Z0-9_-]", "_", name).lower()
-            if self._get_engine().find_one(DbRef, DbRef.name == name):
-                # Name has duplicate: Append id-based hash to ensure name is different and unique
-                name = f"{name}_{hashlib.sha256(str(id).encode()).hexdigest()[:8]}"
-            name = f"{self.name}_{name}"
-            db_ref = self._get_engine().save(DbRef(id=id, name=name))
-        if db_ref:
-            self.db_refs[id] = db_ref  # Add to memory cache
-            return self._get_engine(db_ref.name)
+        db_name = self.db_names.get(id)
+        if not db_name and name:
+            db_name = self._create_db_name(id, name)
+            try:
+                self._get_engine().save(DbRef(id=id, name=db_name))
+            except BaseException:
+                self._unregister_db_name(id, db_name)  # Not persisted
+                raise
+        if db_name:
+            engine = self._get_engine(db_name)
+            if db_name not in self._configured_db_names:
+                engine.configure_database(self.models, update_existing_indexes=True)
+                self._configured_db_names.add(db_name)
+            return engine
+        return None
+
+    async def get_aio_engine(
+        self, id: int | None = None, name: str | None = None
+    ) -> AIOEngine | None:
+        """Get async engine with database of given id. If no id, get async engine with main database.
+        If nonexistent, create database with given name, if no name, return None."""
+        if id is None:
+            return self._get_aio_engine()
+        db_name = self.db_names.get(id)
+        if not db_name and name:
+            db_name = self._create_db_name(id, name)
+            try:
+                await self._get_aio_engine().save(DbRef(id=id, name=db_name))
+            except BaseException:
+                # Not persisted (Registered before save so concurrent creations can't take the same name)
+                self._unregister_db_name(id, db_name)
+                raise
+        if db_name:
+            engine = self._get_aio_engine(db_name)
+            if db_name not in self._configured_db_names:
+                # Marked only once configured, so a failed configuration is retried (Concurrent ones are idempotent)
+                await engine.configure_database(
+                    self.models, update_existing_indexes=True
+                )
+                self._configured_db_names.add(db_name)
+            return engine
         return None
 
     def close(self):
         log.loading(f"Database client closing...")
-        self._engine.client.close()
+        self._client.close()
+        self._aio_client.close()
         log.success(f"Database client closed.")
@@ -0,0 +1,29 @@
+from datetime import UTC, datetime
+
+from odmantic import Field, Model
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Xp Backfill Checkpoint
+# ----------------------------------------------------------------------------------------------------
+class XpBackfillCheckpoint(Model):
+    """Database model for storage of progress of a guild xp backfill, so an interrupted backfill resumes where it stopped."""
+
+    model_config = {"collection": "xp_backfills"}
+
+    id: str = Field(primary_field=True, default="xp_backfill")  # One per guild
+    is_reset: bool = False  # Replace actors xp with backfilled xp, instead of adding it
+    before_id: int  # Backfill start snowflake (Newer messages earn xp live)
+    channel_ids: list[int]  # Channels to scan
+    cursors: dict[str, int] = {}  # Channel id -> last scanned message id
+    done_channel_ids: list[int] = []
+    messages_count: int = 0  # Scored messages
+    xp_totals: dict[str, int] = {}  # Actor id -> backfilled xp
+    names: dict[str, list[str]] = {}  # Actor id -> [name, display name]
+    applied_count: int = 0  # Actors written (in ascending id order)
+    started_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    @property
+    def is_scanned(self) -> bool:
+        return len(self.done_channel_ids) >= len(self.channel_ids)
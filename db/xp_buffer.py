@@ -0,0 +1,202 @@
+from asyncio import Lock
+from datetime import UTC, datetime
+
+from odmantic import AIOEngine
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+from db.actor import Actor
+from db.xp_gain import XpGain
+from utils.log import logger
+
+log = logger(__name__)
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Xp Entry
+# ----------------------------------------------------------------------------------------------------
+class XpEntry(BaseModel):
+    """Buffered actor with xp & gold gains not yet written to database."""
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    db: AIOEngine
+    actor: Actor
+    xp: int = 0
+    gold: int = 0
+    is_new: bool = False  # Actor not in database yet
+
+    @property
+    def is_dirty(self) -> bool:
+        return self.is_new or self.xp != 0 or self.gold != 0
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Xp Buffer
+# ----------------------------------------------------------------------------------------------------
+class XpBuffer:
+    """Write-behind accumulator of actor xp & gold gains, keyed by (guild, actor).
+    Gains are applied to in-memory actors right away (for level-up detection) and written to database
+    in batched `$inc` bulk writes on flush, along with xp gain buckets (timed at flush).
+    """
+
+    FLUSH_SIZE = 100  # Number of dirty actors that should trigger a flush
+
+    def __init__(self):
+        self._entries: dict[tuple[int, int], XpEntry] = {}
+        self._flush_lock = Lock()
+        self._held_guild_ids: set[int] = set()  # Gains kept buffered, not flushed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def is_full(self) -> bool:
+        held_count = sum(key[0] in self._held_guild_ids for key in self._entries)
+        return len(self._entries) - held_count >= self.FLUSH_SIZE
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def load(
+        self, db: AIOEngine, guild_id: int, actor: Actor | int
+    ) -> Actor | None:
+        """Get buffered actor of given guild. If not buffered, load it from given database and buffer it.
+        If given actor instance is not in database either, buffer it as new. If nonexistent, get None.
+        """
+        key = (guild_id, actor if isinstance(actor, int) else actor.id)
+        if entry := self._entries.get(key):
+            return entry.actor
+        stored_actor = await db.find_one(Actor, Actor.id == key[1])
+        if entry := self._entries.get(key):  # Buffered by another task meanwhile
+            return entry.actor
+        if stored_actor:
+            entry = XpEntry(db=db, actor=stored_actor)
+        elif isinstance(actor, Actor):
+            entry = XpEntry(
+                db=db, actor=actor, xp=actor.xp, gold=actor.gold, is_new=True
+            )
+        else:
+            return None
+        self._entries[key] = entry
+        return entry.actor
+
+    def gain(self, guild_id: int, actor: Actor, xp: int = 0, gold: int = 0):
+        """Add given xp & gold to buffered actor of given guild."""
+        entry = self._entries[(guild_id, actor.id)]
+        entry.actor.xp += xp
+        entry.actor.gold += gold
+        entry.xp += xp
+        entry.gold += gold
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def hold(self, guild_id: int, drop_xp: bool = False):
+        """Keep gains of given guild buffered (not flushed) until released, e.g. while its actors are rewritten.
+        If drop xp, discard its xp gains pending so far (e.g. when they are about to be recounted).
+        """
+        self._held_guild_ids.add(guild_id)
+        if drop_xp:
+            for key, entry in self._entries.items():
+                if key[0] == guild_id:
+                    entry.actor.xp -= entry.xp
+                    entry.xp = 0
+
+    async def release(self, guild_id: int):
+        """Flush gains of given guild again, rebasing its buffered actors on their database state (applying held
+        gains & resulting level-ups), so stale actors don't overwrite it."""
+        if guild_id not in self._held_guild_ids:
+            return
+        for key, entry in list(self._entries.items()):
+            if key[0] != guild_id:
+                continue
+            stored_actor = await entry.db.find_one(Actor, Actor.id == key[1])
+            if not stored_actor:
+                continue
+            stored_actor.xp += entry.xp
+            stored_actor.gold += entry.gold
+            if levels_gained := stored_actor.try_level_up():
+                gold = Actor.levels_gold(
+                    stored_actor.level - levels_gained, stored_actor.level
+                )
+                stored_actor.gold += gold
+                entry.gold += gold
+            entry.actor, entry.is_new = stored_actor, False
+        self._held_guild_ids.discard(guild_id)
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def flush(self) -> list[tuple[int, int]]:
+        """Write all buffered gains (& xp gain buckets) to database and release clean actors.
+        Get (guild, actor) keys of written actors."""
+        async with self._flush_lock:
+            # Take pending gains, leaving actors buffered while writing so they are not reloaded stale
+            pending: dict[
+                AIOEngine, list[tuple[tuple[int, int], XpEntry, int, int, bool]]
+            ] = {}
+            for key, entry in self._entries.items():
+                if entry.is_dirty and key[0] not in self._held_guild_ids:
+                    pending.setdefault(entry.db, []).append(
+                        (key, entry, entry.xp, entry.gold, entry.is_new)
+                    )
+                    entry.xp, entry.gold, entry.is_new = 0, 0, False
+
+            written_keys: list[tuple[int, int]] = []
+            now = datetime.now(UTC)
+            for db, changes in pending.items():
+                requests = [
+                    self._update_request(entry.actor, xp, gold, is_new)
+                    for _, entry, xp, gold, is_new in changes
+                ]
+                try:
+                    await db.get_collection(Actor).bulk_write(requests, ordered=False)
+                    written_keys += [key for key, *_ in changes]
+                except Exception as e:
+                    log.exception(
+                        f"XP buffer flush to '{db.database_name}' failed: {e}"
+                    )
+                    for (
+                        _,
+                        entry,
+                        xp,
+                        gold,
+                        is_new,
+                    ) in changes:  # Put back to retry later
+                        entry.xp += xp
+                        entry.gold += gold
+                        entry.is_new |= is_new
+                    continue
+
+                # Record xp gains (Not retried, as actors are already written)
+                gain_requests = [
+                    XpGain.gain_request(entry.actor.id, xp, now)
+                    for _, entry, xp, *_ in changes
+                    if xp > 0
+                ]
+                if not gain_requests:
+                    continue
+                try:
+                    await db.get_collection(XpGain).bulk_write(
+                        gain_requests, ordered=False
+                    )
+                except Exception as e:
+                    log.exception(f"XP gains write to '{db.database_name}' failed: {e}")
+
+            # Release actors that did not gain anything meanwhile, so next load is fresh from database
+            for key, entry in list(self._entries.items()):
+                if not entry.is_dirty and key[0] not in self._held_guild_ids:
+                    del self._entries[key]
+            return written_keys
+
+    @staticmethod
+    def _update_request(actor: Actor, xp: int, gold: int, is_new: bool) -> UpdateOne:
+        """Get upsert request incrementing xp & gold and raising level of given actor."""
+        update: dict = {
+            "$inc": {"xp": xp, "gold": gold},
+            "$max": {"level": actor.level},
+        }
+        if is_new:
+            doc = actor.model_dump_doc()
+            for field in ("_id", "xp", "gold", "level"):
+                doc.pop(field, None)
+            update["$setOnInsert"] = doc
+        return UpdateOne({"_id": actor.id}, update, upsert=True)
@@ -0,0 +1,103 @@
+from datetime import UTC, datetime, timedelta
+from typing import ClassVar
+
+from odmantic import AIOEngine, Field, Model
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Xp Gain
+# ----------------------------------------------------------------------------------------------------
+class XpGain(Model):
+    """Database model for storage of xp gained by an actor within a fixed time window (bucket).
+    Buckets expire after TTL, so storage stays bounded."""
+
+    model_config = {
+        "collection": "xp_gains",
+        "indexes": lambda: [
+            IndexModel(
+                [("start", ASCENDING)],
+                expireAfterSeconds=XpGain.TTL,
+                name="start_ttl",
+            )
+        ],
+    }
+
+    id: str = Field(primary_field=True)  # "{actor id}:{window start timestamp}"
+    actor_id: int
+    start: datetime  # Window start (UTC)
+    xp: int = 0
+
+    WINDOW: ClassVar[int] = 3600  # 1 hr
+    TTL: ClassVar[int] = 604800  # 7 days
+
+    # ----------------------------------------------------------------------------------------------------
+
+    @classmethod
+    def window_start(cls, at: datetime) -> datetime:
+        """Get start of window containing given time."""
+        timestamp = int(at.timestamp())
+        return datetime.fromtimestamp(timestamp - timestamp % cls.WINDOW, UTC)
+
+    @classmethod
+    def gain_request(
+        cls, actor_id: int, xp: int, at: datetime | None = None
+    ) -> UpdateOne:
+        """Get upsert request adding given xp to bucket of given actor & time (now by default)."""
+        start = cls.window_start(at or datetime.now(UTC))
+        return UpdateOne(
+            {"_id": f"{actor_id}:{int(start.timestamp())}"},
+            {
+                "$inc": {"xp": xp},
+                "$setOnInsert": {"actor_id": actor_id, "start": start},
+            },
+            upsert=True,
+        )
+
+    @classmethod
+    async def totals(
+        cls,
+        db: AIOEngine,
+        since: datetime,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> list[tuple[int, int]]:
+        """Get (actor id, xp) tuples of xp gained in windows from given time (to given time), most xp first.
+        Precision is one window: the window containing given since time is included."""
+        start_match: dict = {"$gte": cls.window_start(since)}
+        if until:
+            start_match["$lt"] = until
+        pipeline: list[dict] = [
+            {"$match": {"start": start_match}},
+            {"$group": {"_id": "$actor_id", "xp": {"$sum": "$xp"}}},
+            {"$sort": {"xp": -1, "_id": 1}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+        cursor = db.get_collection(cls).aggregate(pipeline)
+        return [(doc["_id"], doc["xp"]) async for doc in cursor]
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Xp Gain Report
+# ----------------------------------------------------------------------------------------------------
+class XpGainReport(Model):
+    """Database model for storage of end of xp gains last reported in guild log channel."""
+
+    model_config = {"collection": "xp_gain_reports"}
+
+    id: str = Field(primary_field=True, default="xp_gain_report")  # One per guild
+    reported_until: datetime
+
+    INTERVAL: ClassVar[int] = 21600  # 6 hrs
+
+    @classmethod
+    def period_end(cls, at: datetime) -> datetime:
+        """Get end of last complete report period before given time."""
+        timestamp = int(at.timestamp())
+        return datetime.fromtimestamp(timestamp - timestamp % cls.INTERVAL, UTC)
+
+    @classmethod
+    def first(cls, at: datetime) -> "XpGainReport":
+        """Create report state for first report, covering only last complete period before given time."""
+        return cls(reported_until=cls.period_end(at) - timedelta(seconds=cls.INTERVAL))
@@ -9,7 +9,9 @@ from discord import Intents
 
 from api.main import ActApi
 from bot.main import ActBot
+from db.actor import Actor
 from db.main import ActDb
+from db.xp_gain import XpGain
 from utils.log import logger
 
 log = logger(__name__)
@@ -59,7 +61,7 @@ async def main():
         # Create & add database component
         db = None
         if db_enabled:
-            db = ActDb(host=db_uri, name=name)
+            db = ActDb(host=db_uri, name=name, models=[Actor, XpGain])
         else:
             log.warning("Database component is turned off.")
 
@@ -107,12 +109,12 @@ async def main():
             log.info("Keyboard interrupt received.")
         elif not isinstance(e, asyncio.CancelledError):
             log.exception(e)
-        if db:
-            db.close()
         if bot:
-            await bot.close()
+            await bot.close()  # Before database, so cogs can flush pending writes
         if api:
             await api.close()
+        if db:
+            db.close()
 
     finally:
         print("\n❤  Bye!\n")
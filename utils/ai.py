@@ -1,11 +1,24 @@
-from typing import Any
+from abc import ABC, abstractmethod
+from asyncio import Future, Lock, Task, create_task, get_running_loop, sleep
+from collections import OrderedDict
+from hashlib import sha256
+from time import monotonic
+from math import ceil
+from typing import Any, Awaitable, Callable, ClassVar
 
 from google.genai import Client
 from google.genai.chats import AsyncChat
-from google.genai.types import Content, GenerateContentConfig, Part
+from google.genai.errors import APIError
+from google.genai.types import (
+    Content,
+    GenerateContentConfig,
+    GenerateContentResponse,
+    Part,
+)
 from pydantic import BaseModel, Field, StringConstraints, field_validator
 from typing_extensions import Annotated
 
+from utils.cache import ActCache
 from utils.file import ActFile
 from utils.log import logger
 
@@ -13,26 +26,245 @@ log = logger(__name__)
 NonEmptyStr = Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)]
 
 
+# ----------------------------------------------------------------------------------------------------
+# * Prompt Coalesced
+# ----------------------------------------------------------------------------------------------------
+class PromptCoalesced(Exception):
+    """Prompt merged into a later prompt of same session, which alone gets the response."""
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Prompt Block
+# ----------------------------------------------------------------------------------------------------
+class PromptBlock(BaseModel):
+    """Block of prompt text, kept or cut by prompt planner according to its priority."""
+
+    text: str  # Lead text (e.g. label & CSV header)
+    priority: int = 0  # Lower is kept first, 0 is always kept whole
+    # If any, following lead text, block can be truncated to its leading units (e.g. CSV rows)
+    units: list[str] = []
+    separator: str = "\n"  # Joins lead text & units
+
+    @property
+    def full_text(self) -> str:
+        return (
+            self.separator.join([self.text, *self.units]) if self.units else self.text
+        )
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Pending Prompt
+# ----------------------------------------------------------------------------------------------------
+class PendingPrompt(BaseModel):
+    """Prompt queued in a chat session, awaiting its response."""
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    text: str | list[PromptBlock]
+    file: ActFile | None = None
+    coalesce: bool = False
+    on_stream: Callable[[str], Awaitable[Any]] | None = None
+    future: Future
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Act Rate Limiter
+# ----------------------------------------------------------------------------------------------------
+class ActRateLimiter:
+    """Shared adaptive token-bucket limiter of requests & tokens per minute.
+    Callers queue (wait their turn) for capacity instead of being rejected. On rate limit error, everyone waits for
+    the retry-after delay and the rate is lowered, then gradually restored on success.
+    """
+
+    MIN_RATE_FACTOR = 0.25
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.rate_factor = 1.0  # Lowered on rate limit errors
+        self._requests = float(requests_per_minute)  # Available in bucket
+        # Available in bucket, negative if overspent
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = monotonic()
+        self._blocked_until = 0.0
+        self._queue_depth = 0
+        self._lock = Lock()  # First come, first served
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for capacity."""
+        return self._queue_depth
+
+    @property
+    def wait_time(self) -> float:
+        """Rough seconds a new request would wait for capacity."""
+        self._refill()
+        blocked_time = max(0.0, self._blocked_until - monotonic())
+        request_time = 60 / (self.requests_per_minute * self.rate_factor)
+        return (
+            blocked_time
+            + max(0.0, self._queue_depth + 1 - self._requests) * request_time
+        )
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def acquire(self, tokens: int):
+        """Wait until one request of given estimated tokens can be sent, then spend it."""
+        # Oversized requests wait for a full bucket at most
+        tokens = min(tokens, self.tokens_per_minute)
+        self._queue_depth += 1
+        try:
+            async with self._lock:
+                while (delay := self._delay(tokens)) > 0:
+                    await sleep(delay)
+                self._requests -= 1
+                self._tokens -= tokens
+        finally:
+            self._queue_depth -= 1
+
+    def record(self, estimated_tokens: int, tokens: int | None):
+        """Correct spent tokens of a successful request with its actual usage, and gradually restore rate."""
+        if tokens is not None:
+            self._tokens -= tokens - min(estimated_tokens, self.tokens_per_minute)
+        self.rate_factor = min(1.0, self.rate_factor * 1.1)
+
+    def throttle(self, retry_after: float | None = None):
+        """Make all requests wait for given retry-after delay (or one request refill time), and lower rate."""
+        self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+        if retry_after is None:
+            retry_after = 60 / (self.requests_per_minute * self.rate_factor)
+        self._blocked_until = max(self._blocked_until, monotonic() + retry_after)
+        self._requests = min(self._requests, 0.0)
+
+    def _delay(self, tokens: int) -> float:
+        """Get seconds to wait before one request of given tokens can be sent."""
+        self._refill()
+        now = monotonic()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        requests_rate = self.requests_per_minute * self.rate_factor / 60
+        tokens_rate = self.tokens_per_minute * self.rate_factor / 60
+        return max(
+            0.0,
+            (1 - self._requests) / requests_rate,
+            (tokens - self._tokens) / tokens_rate,
+        )
+
+    def _refill(self):
+        now = monotonic()
+        elapsed_time = now - self._refilled_at
+        self._refilled_at = now
+        self._requests = min(
+            self.requests_per_minute,
+            self._requests
+            + elapsed_time * self.requests_per_minute * self.rate_factor / 60,
+        )
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens
+            + elapsed_time * self.tokens_per_minute * self.rate_factor / 60,
+        )
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Act AI Backend
+# ----------------------------------------------------------------------------------------------------
+class ActAiBackend(ABC):
+    """Abstract model provider of **ActAi**.
+    Created chats must provide `send_message`, `send_message_stream` & `_curated_history` like **AsyncChat**.
+    """
+
+    @abstractmethod
+    def create_chat(
+        self, model: str, history: list[Content] | None = None
+    ) -> AsyncChat:
+        """Create chat session of given model, initialized with given history."""
+        pass
+
+    @abstractmethod
+    async def generate_content(
+        self, model: str, contents: str
+    ) -> GenerateContentResponse:
+        """Generate single response of given model to given contents, outside any chat session."""
+        pass
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Gemini Backend
+# ----------------------------------------------------------------------------------------------------
+class GeminiBackend(ActAiBackend):
+    """Google Gemini API model provider."""
+
+    def __init__(self, api_key: str):
+        self.client = Client(api_key=api_key)
+
+    def create_chat(
+        self, model: str, history: list[Content] | None = None
+    ) -> AsyncChat:
+        return self.client.aio.chats.create(model=model, history=history)  # type: ignore
+
+    async def generate_content(
+        self, model: str, contents: str
+    ) -> GenerateContentResponse:
+        return await self.client.aio.models.generate_content(
+            model=model, contents=contents
+        )
+
+
 # ----------------------------------------------------------------------------------------------------
 # * Act AI
 # ----------------------------------------------------------------------------------------------------
 class ActAi(BaseModel):
     """Multi-session AI chat bot interface."""
 
+    model_config = {"arbitrary_types_allowed": True}
+
     # ----------------------------------------------------------------------------------------------------
 
     api_key: NonEmptyStr
     instructions: NonEmptyStr | list[NonEmptyStr] | None = None
     model_name: str = Field(alias="model", default="gemma-4-31b-it")
     response_char_limit: int = 2000  # Used to be 4000 hmm
+    backend: ActAiBackend | None = Field(default=None, exclude=True)  # If none, Gemini
+    session_max: int = 256  # Live sessions kept in memory
+    session_idle_ttl: float = 3600  # 1 hr
+    # Recently used sessions are never evicted for capacity
+    session_busy_time: float = 60  # 1 min
+    prompt_token_budget: int = 6000  # Planned prompt size, excluding history
+    requests_per_minute: int = 30  # Model quota
+    tokens_per_minute: int = 15000  # Model quota
+    rate_limit_retries: int = 2
+    summary_char_limit: int = 2000
+    response_cache_ttl: float | None = None  # If none, responses are not cached
+    response_cache_max: int = 256
 
-    _client: Client | None = None
+    CHARS_PER_TOKEN: ClassVar[int] = 4  # Rough estimate
+    IMAGE_TOKENS: ClassVar[int] = 258  # Rough estimate
+    SUMMARY_PREFIX: ClassVar[str] = "Summary of our earlier conversation:\n"
+    SUMMARY_INSTRUCTIONS: ClassVar[str] = (
+        "Summarize the following conversation in under {char_limit} characters, for ur own future reference. "
+        "Keep who said what (names & mentions), facts, preferences, promises & unresolved topics. "
+        "Merge any earlier summary into it. Reply with the summary only.\n\n"
+    )
+
+    _limiter: ActRateLimiter | None = None
     _config: GenerateContentConfig | None = None
-    _chats: dict[int | str, AsyncChat | None] = {}
-    _current_chat_id: int = 0
+    # Least recently used first
+    _chats: OrderedDict[int | str, AsyncChat] = OrderedDict()
+    _used_at: dict[int | str, float] = {}
+    _queues: dict[int | str, list[PendingPrompt]] = {}  # Session id -> pending prompts
+    _workers: dict[int | str, Task] = {}  # Session id -> queue processing task
+    _locks: dict[int | str, Lock] = {}  # Session id -> history modification lock
+    _responses: ActCache[str, str] | None = None  # Prompt key -> response text
 
     def model_post_init(self, context: Any):
-        self._client = Client(api_key=self.api_key)
+        if not self.backend:
+            self.backend = GeminiBackend(self.api_key)
+        self._limiter = ActRateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        if self.response_cache_ttl:
+            self._responses = ActCache(
+                self.response_cache_max, ttl=self.response_cache_ttl
+            )
         self._config = GenerateContentConfig(
             system_instruction=self.instructions, response_modalities=["TEXT"]  # type: ignore
         )
@@ -49,19 +281,361 @@ class ActAi(BaseModel):
 
     # ----------------------------------------------------------------------------------------------------
 
-    async def prompt(self, text: str, file: ActFile | None = None) -> str | None:
-        chat = self.use_session(self._current_chat_id)
+    async def prompt(
+        self,
+        id: int,
+        text: str | list[PromptBlock],
+        file: ActFile | None = None,
+        coalesce: bool = False,
+        on_stream: Callable[[str], Awaitable[Any]] | None = None,
+    ) -> str | None:
+        """Prompt chat session of given id with given text, or prompt blocks planned when sent.
+        Prompts of same session are serialized, different sessions run in parallel.
+        If coalesce, consecutive coalescing prompts queued meanwhile are merged into one model call answered to the last one,
+        and earlier ones raise **PromptCoalesced**.
+        If on stream callback given, response is streamed and callback awaited with response text so far on each chunk.
+        """
+        future: Future[str | None] = get_running_loop().create_future()
+        pending_prompt = PendingPrompt(
+            text=text, file=file, coalesce=coalesce, on_stream=on_stream, future=future
+        )
+        self._queues.setdefault(id, []).append(pending_prompt)
+        if id not in self._workers:
+            self._workers[id] = create_task(self._process_queue(id))
+        return await future
+
+    async def _process_queue(self, id: int):
+        """Send pending prompts of given session one batch at a time, until none left."""
+        queue = self._queues[id]
+        batch: list[PendingPrompt] = []
+        try:
+            while queue:
+                batch = [queue.pop(0)]
+                while batch[-1].coalesce and queue and queue[0].coalesce:
+                    batch.append(queue.pop(0))
+                *coalesced, last = batch
+                for pending_prompt in coalesced:
+                    if not pending_prompt.future.done():
+                        pending_prompt.future.set_exception(PromptCoalesced())
+                try:
+                    async with self._get_lock(id):
+                        response_text = await self._send(
+                            id,
+                            self.merge_prompts(
+                                [pending_prompt.text for pending_prompt in batch]
+                            ),
+                            [pending_prompt.file for pending_prompt in batch],
+                            last.on_stream,
+                        )
+                except Exception as e:
+                    if not last.future.done():
+                        last.future.set_exception(e)
+                    continue
+                if not last.future.done():
+                    last.future.set_result(response_text)
+        finally:
+            del self._workers[id]
+            # Worker cancelled: nothing left to answer them
+            for pending_prompt in batch + queue:
+                if not pending_prompt.future.done():
+                    pending_prompt.future.cancel()
+            del self._queues[id]
+
+    async def _send(
+        self,
+        id: int,
+        text: str,
+        files: list[ActFile | None],
+        on_stream: Callable[[str], Awaitable[Any]] | None = None,
+    ) -> str | None:
+        """Send given text & image files as one message to chat session of given id. Get response text.
+        If on stream callback given, stream response and await callback with response text so far on each chunk.
+        """
+        chat = self.use_session(id)
         message = [Part(text=text)]
-        if file and file.major_type == "image":
-            message.append(
-                Part.from_bytes(data=file.data, mime_type=file.mime_type or "")
+        for file in files:
+            if file and file.major_type == "image":
+                message.append(
+                    Part.from_bytes(data=file.data, mime_type=file.mime_type or "")
+                )
+        cache_key = (
+            self._response_key(chat, message) if self._responses is not None else None
+        )
+        if cache_key and (cached_text := self._responses.get(cache_key)):  # type: ignore
+            return await self._use_cached_response(
+                chat, message, cached_text, on_stream
+            )
+        tokens = self.estimate_tokens(
+            message[0].text or ""
+        ) + self.estimate_history_tokens(id)
+        tokens += (len(message) - 1) * self.IMAGE_TOKENS
+
+        async def send() -> tuple[str | None, int | None]:
+            if not on_stream:
+                response = await chat.send_message(message, self._config)  # type: ignore
+                usage = response.usage_metadata if response else None
+                return (
+                    self._limit_text(response.text if response else None),
+                    usage and usage.total_token_count,
+                )
+            response_text = ""
+            usage = None
+            async for chunk in await chat.send_message_stream(message, self._config):  # type: ignore
+                usage = chunk.usage_metadata or usage
+                if chunk.text:
+                    response_text += chunk.text
+                    await self._notify_stream(on_stream, self._limit_text(response_text))  # type: ignore
+            return (
+                self._limit_text(response_text or None),
+                usage and usage.total_token_count,
             )
-        response = await chat.send_message(message, self._config)  # type: ignore
-        response_text = response.text if response else None
-        if response_text and len(response_text) > self.response_char_limit:
-            response_text = response_text[: (self.response_char_limit - 3)] + "..."
+
+        response_text, _ = await self._call_limited(send, tokens)
+        if cache_key and response_text:
+            # Cache by history before & after exchange, so a duplicate prompt right after (e.g. a retry) is also answered
+            self._responses.set(cache_key, response_text)  # type: ignore
+            self._responses.set(self._response_key(chat, message), response_text)  # type: ignore
+        return response_text
+
+    async def _use_cached_response(
+        self,
+        chat: AsyncChat,
+        message: list[Part],
+        response_text: str,
+        on_stream: Callable[[str], Awaitable[Any]] | None = None,
+    ) -> str:
+        """Answer given message of given chat session with given cached response, without model call.
+        Exchange is added to history, unless it already ends with it (duplicate prompt).
+        """
+        history = chat._curated_history
+        last_texts = [
+            "".join(part.text or "" for part in content.parts or [])
+            for content in history[-2:]
+        ]
+        if len(last_texts) < 2 or (
+            self._normalize(last_texts[0]) != self._normalize(message[0].text)
+            or self._limit_text(last_texts[1]) != response_text
+        ):
+            history += [
+                Content(role="user", parts=message),
+                Content(role="model", parts=[Part(text=response_text)]),
+            ]
+        if on_stream:
+            await self._notify_stream(on_stream, response_text)
+        log.info(f"AI response cache hit (ratio: {self._responses.hit_ratio:.0%}).")  # type: ignore
         return response_text
 
+    @staticmethod
+    async def _notify_stream(on_stream: Callable[[str], Awaitable[Any]], text: str):
+        """Await given on stream callback with given response text so far. If it fails (e.g. message edit failed), log it,
+        so response is still read to end & added to history."""
+        try:
+            await on_stream(text)
+        except Exception as e:
+            log.warning(f"AI response stream callback failed: {e!r}")
+
+    @staticmethod
+    def _normalize(text: str | None) -> str:
+        """Get given text with whitespace runs collapsed."""
+        return " ".join((text or "").split())
+
+    @staticmethod
+    def _response_key(chat: AsyncChat, message: list[Part]) -> str:
+        """Get response cache key of given message (whitespace normalized) sent to given chat session with its current history."""
+        digest = sha256(ActAi._normalize(message[0].text).encode())
+        for part in message[1:]:
+            digest.update(
+                b"\0image:"
+                + (
+                    part.inline_data.data
+                    if part.inline_data and part.inline_data.data
+                    else b""
+                )
+            )
+        for content in chat._curated_history:
+            digest.update(f"\0{content.role}:".encode())
+            for part in content.parts or []:
+                digest.update((part.text or "").encode())
+                if part.inline_data and part.inline_data.data:
+                    digest.update(part.inline_data.data)
+        return digest.hexdigest()
+
+    async def _call_limited(
+        self, call: Callable[[], Awaitable[tuple[Any, int | None]]], tokens: int
+    ) -> tuple[Any, int | None]:
+        """Await given model call (getting (result, used tokens) tuple) once rate limiter allows given estimated tokens.
+        On rate limit error, throttle limiter and retry."""
+        retries_count = 0
+        while True:
+            await self.limiter.acquire(tokens)
+            try:
+                result, used_tokens = await call()
+            except APIError as e:
+                if e.code != 429 or retries_count >= self.rate_limit_retries:
+                    raise
+                retries_count += 1
+                retry_after = self.get_retry_after(e)
+                self.limiter.throttle(retry_after)
+                log.warning(
+                    f"AI rate limited, retrying in {retry_after or "a moment"} sec (queue: {self.limiter.queue_depth})."
+                )
+                continue
+            self.limiter.record(tokens, used_tokens)
+            return result, used_tokens
+
+    @property
+    def limiter(self) -> ActRateLimiter:
+        return self._limiter  # type: ignore
+
+    @staticmethod
+    def get_retry_after(error: APIError) -> float | None:
+        """Get retry delay (sec) hinted by given API error, from its headers or details. If none, get None."""
+        headers = getattr(error.response, "headers", None)
+        try:
+            if headers and (retry_after := headers.get("retry-after")):
+                return float(retry_after)
+            details = (
+                error.details.get("error", {}).get("details", [])
+                if isinstance(error.details, dict)
+                else []
+            )
+            for detail in details:
+                if isinstance(detail, dict) and (
+                    retry_delay := detail.get("retryDelay")
+                ):
+                    return float(str(retry_delay).rstrip("s"))
+        except ValueError:
+            pass
+        return None
+
+    def _limit_text(
+        self, text: str | None, char_limit: int | None = None
+    ) -> str | None:
+        """Get given text truncated to given char limit (response char limit by default)."""
+        char_limit = char_limit or self.response_char_limit
+        if text and len(text) > char_limit:
+            text = text[: (char_limit - 3)] + "..."
+        return text
+
+    def _get_lock(self, id: int) -> Lock:
+        lock = self._locks.get(id)
+        if not lock:
+            lock = self._locks[id] = Lock()
+        return lock
+
+    # ----------------------------------------------------------------------------------------------------
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        """Get rough number of tokens of given text."""
+        return ceil(len(text) / cls.CHARS_PER_TOKEN)
+
+    def estimate_history_tokens(self, id: int) -> int:
+        """Get rough number of tokens of chat session history of given id. If nonexistent, get 0."""
+        chat = self._chats.get(id)
+        if not chat:
+            return 0
+        tokens = 0
+        for content in chat._curated_history:
+            for part in content.parts or []:
+                tokens += (
+                    self.IMAGE_TOKENS
+                    if part.inline_data
+                    else self.estimate_tokens(part.text or "")
+                )
+        return tokens
+
+    def plan_prompt(
+        self, blocks: list[PromptBlock], token_budget: int | None = None
+    ) -> str:
+        """Join given blocks (in given order) within given token budget (prompt token budget by default).
+        Blocks are kept by priority: whole if they fit, or truncated to leading units if separable, or dropped otherwise.
+        """
+        chars_left = (token_budget or self.prompt_token_budget) * self.CHARS_PER_TOKEN
+        texts = [""] * len(blocks)
+        for i, block in sorted(enumerate(blocks), key=lambda item: item[1].priority):
+            full_text = block.full_text
+            if block.priority <= 0 or len(full_text) <= chars_left:
+                texts[i] = full_text
+            elif block.units:
+                chars_count = len(block.text)
+                kept_count = 0
+                for unit in block.units:
+                    chars_count += len(block.separator) + len(unit)
+                    if chars_count > chars_left:
+                        break
+                    kept_count += 1
+                if kept_count:  # More than the lead text (e.g. label/header)
+                    texts[i] = block.separator.join(
+                        [block.text, *block.units[:kept_count]]
+                    )
+            chars_left = max(0, chars_left - len(texts[i]))
+        return "".join(texts)
+
+    def merge_prompts(self, prompts: list[str | list[PromptBlock]]) -> str:
+        """Get one planned text of given (coalesced) prompts. Always kept blocks (e.g. member messages) of all prompts are kept
+        in order, but context blocks only from last prompt (latest), so merged prompt stays within prompt token budget.
+        """
+        *earlier_prompts, last_prompt = prompts
+        blocks: list[PromptBlock] = []
+        for prompt in earlier_prompts:
+            if isinstance(prompt, str):
+                blocks.append(PromptBlock(text=prompt))
+            else:
+                blocks += [block for block in prompt if block.priority <= 0]
+            blocks.append(PromptBlock(text="\n"))
+        blocks += (
+            [PromptBlock(text=last_prompt)]
+            if isinstance(last_prompt, str)
+            else last_prompt
+        )
+        return self.plan_prompt(blocks)
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def summarize_session(self, id: int, keep: int) -> tuple[str, int] | None:
+        """Compress history of chat session of given id, except given number of last contents, into a rolling summary
+        (merging previous summary). Get (summary, number of contents replaced) tuple. If nothing to summarize, get None.
+        """
+        async with self._get_lock(id):
+            chat = self._chats.get(id)
+            if not chat or len(chat._curated_history) <= keep + 2:
+                return None
+            contents = (
+                chat._curated_history[:-keep] if keep else chat._curated_history[:]
+            )
+            transcript = "\n".join(
+                f"{content.role}: {" ".join(part.text for part in content.parts or [] if part.text)}"
+                for content in contents
+            )
+            contents_text = (
+                self.SUMMARY_INSTRUCTIONS.format(char_limit=self.summary_char_limit)
+                + transcript
+            )
+
+            async def summarize() -> tuple[str | None, int | None]:
+                response = await self.backend.generate_content(self.model_name, contents_text)  # type: ignore
+                usage = response.usage_metadata if response else None
+                text = response.text if response else None
+                return text, usage and usage.total_token_count
+
+            summary, _ = await self._call_limited(
+                summarize, self.estimate_tokens(contents_text)
+            )
+            summary = self._limit_text(summary, self.summary_char_limit)
+            if not summary:
+                return None
+            chat._curated_history[: len(contents)] = self.summary_history(summary)
+            return summary, len(contents)
+
+    @classmethod
+    def summary_history(cls, summary: str) -> list[Content]:
+        """Get history contents introducing given summary of earlier conversation."""
+        return [
+            Content(role="user", parts=[Part(text=f"{cls.SUMMARY_PREFIX}{summary}")]),
+            Content(role="model", parts=[Part(text="Ok.")]),
+        ]
+
     # async def prompt_image(self, text: str) -> BytesIO | None:
     #     candiates = response.candidates[0] if response and response.candidates else None
     #     parts =  candiates.content.parts if candiates and candiates.content else None
@@ -97,26 +671,74 @@ class ActAi(BaseModel):
                     else:
                         log.warning(f"Skipping history entry with invalid role: {role}")
                 history = valid_history
-            chat = self._client.aio.chats.create(model=self.model_name, history=history)  # type: ignore
+            chat = self.backend.create_chat(self.model_name, history)  # type: ignore
             self._chats[id] = chat
-        self._current_chat_id = id
+        self._chats.move_to_end(id)
+        self._used_at[id] = monotonic()
         return chat
 
+    def has_session(self, id: int) -> bool:
+        """Check if chat session with given id is live."""
+        return bool(self._chats.get(id))
+
     def clear_session(self, id: int):
         """Clear chat session with given id. If nonexistent, get False."""
+        chat = self._chats.pop(id, None)
+        self._used_at.pop(id, None)
+        # Lock kept, as it may be held or awaited: a new one would let sends overlap
+        return bool(chat)
+
+    def pop_cold_sessions(self) -> dict[int | str, list[dict]]:
+        """Remove and get full dumped history of sessions idle past TTL, or least recently used beyond max count.
+        Sessions with prompts in progress are kept."""
+        now = monotonic()
+        excess_count = len(self._chats) - self.session_max
+        cold_sessions = {}
+        for id in list(self._chats):  # Least recently used first
+            idle_time = now - self._used_at.get(id, 0)
+            if id in self._workers or self._get_lock(id).locked():  # In progress
+                continue
+            if idle_time <= self.session_idle_ttl and (
+                len(cold_sessions) >= excess_count
+                or idle_time <= self.session_busy_time
+            ):
+                break
+            chat = self._chats[id]
+            cold_sessions[id] = [
+                content.model_dump(exclude_unset=True)
+                for content in chat._curated_history
+            ]
+            self.clear_session(id)
+        return cold_sessions
+
+    @property
+    def session_count(self) -> int:
+        """Number of live sessions."""
+        return len(self._chats)
+
+    @property
+    def session_bytes(self) -> int:
+        """Approximate bytes held by live sessions histories (text & inline data)."""
+        size = 0
+        for chat in self._chats.values():
+            for content in chat._curated_history:
+                for part in content.parts or []:
+                    size += len(part.text or "")
+                    if part.inline_data and part.inline_data.data:
+                        size += len(part.inline_data.data)
+        return size
+
+    def history_length(self, id: int) -> int:
+        """Get number of contents in chat session history of given id. If nonexistent, get 0."""
         chat = self._chats.get(id)
-        if chat:
-            del self._chats[id]
-            return True
-        return False
-
-    def dump_history(self, id: int | None = None, history_max_items=20) -> list[dict]:
-        """Dump chat session history of given id. If no id, dump current."""
-        id = id or self._current_chat_id
+        return len(chat._curated_history) if chat else 0
+
+    def dump_history(self, id: int, history_max_items=20, start=0) -> list[dict]:
+        """Dump chat session history of given id, from given start index."""
         chat = self.use_session(id)
         return [
             content.model_dump(exclude_unset=True)
-            for content in chat._curated_history[-history_max_items:]
+            for content in chat._curated_history[start:][-history_max_items:]
         ]
 
     # ----------------------------------------------------------------------------------------------------
@@ -0,0 +1,199 @@
+from asyncio import sleep
+from math import ceil
+from random import Random
+from typing import Any, AsyncIterator
+
+from google.genai.errors import ClientError, ServerError
+from google.genai.types import (
+    Candidate,
+    Content,
+    FinishReason,
+    GenerateContentResponse,
+    GenerateContentResponseUsageMetadata,
+    Part,
+)
+
+from utils.ai import ActAiBackend
+
+STUB_WORDS = (
+    "yo lol okay sure maybe nice cool wait what why how when where who really honestly "
+    "guess think know feel like love hate game play win lose gold level xp duel item shop"
+).split()
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Stub Backend
+# ----------------------------------------------------------------------------------------------------
+class StubBackend(ActAiBackend):
+    """Offline deterministic model provider, simulating latency, token usage & failures.
+    Replies only depend on seed, conversation so far & attempt (not on call order), so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        latency: float | tuple[float, float] = 0.5,
+        chunk_latency: float = 0.05,
+        chunk_chars: int = 64,
+        response_chars: int | tuple[int, int] = (80, 600),
+        failure_rate: float = 0.0,
+        failure_code: int = 429,
+        retry_after: float = 1.0,
+        seed: int = 0,
+    ):
+        """
+        :param float latency: Seconds (or (min, max) range) before response, or before first streamed chunk.
+        :param float chunk_latency: Seconds between streamed chunks.
+        :param int chunk_chars: Characters per streamed chunk.
+        :param int response_chars: Characters (or (min, max) range) of response text.
+        :param float failure_rate: Chance (0 - 1) of a call failing with given failure code.
+        :param int failure_code: HTTP status code of failures. E.g. 429 (rate limited), 500, 503.
+        :param float retry_after: Seconds hinted to retry after failures.
+        :param int seed: Seed of all random choices.
+        """
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.chunk_chars = chunk_chars
+        self.response_chars = response_chars
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.retry_after = retry_after
+        self.seed = seed
+        self.calls_count = 0
+        self.failures_count = 0
+        self.tokens_count = 0
+        self._attempts: dict[str, int] = {}  # Conversation key -> calls count
+
+    def create_chat(
+        self, model: str, history: list[Content] | None = None
+    ) -> "StubChat":
+        return StubChat(self, history)
+
+    async def generate_content(
+        self, model: str, contents: str
+    ) -> GenerateContentResponse:
+        content = Content(role="user", parts=[Part(text=contents)])
+        return await self.respond([content])
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def respond(self, contents: list[Content]) -> GenerateContentResponse:
+        """Get simulated response to given conversation, after simulated latency. If simulated failure, raise it."""
+        random = self._random(contents)
+        self.calls_count += 1
+        await sleep(self._pick(random, self.latency))
+        if random.random() < self.failure_rate:
+            self.failures_count += 1
+            error_class = ServerError if self.failure_code >= 500 else ClientError
+            raise error_class(
+                self.failure_code,
+                {
+                    "error": {
+                        "code": self.failure_code,
+                        "message": "Simulated failure.",
+                        "details": [{"retryDelay": f"{self.retry_after}s"}],
+                    }
+                },
+            )
+        response_chars = self._pick(random, self.response_chars)
+        words = []
+        while len(" ".join(words)) < response_chars:
+            words.append(random.choice(STUB_WORDS))
+        text = " ".join(words)[: int(response_chars)]
+        prompt_tokens = ceil(
+            sum(
+                len(part.text or "")
+                for content in contents
+                for part in content.parts or []
+            )
+            / 4
+        )
+        response_tokens = ceil(len(text) / 4)
+        self.tokens_count += prompt_tokens + response_tokens
+        return GenerateContentResponse(
+            candidates=[
+                Candidate(
+                    content=Content(role="model", parts=[Part(text=text)]),
+                    finish_reason=FinishReason.STOP,
+                )
+            ],
+            usage_metadata=GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=response_tokens,
+                total_token_count=prompt_tokens + response_tokens,
+            ),
+        )
+
+    def _random(self, contents: list[Content]) -> Random:
+        """Get random generator seeded by seed, given conversation & attempt (so retries may succeed)."""
+        last_text = "".join(part.text or "" for part in contents[-1].parts or [])
+        key = f"{self.seed}:{len(contents)}:{last_text}"
+        attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        return Random(f"{key}:{attempt}")
+
+    @staticmethod
+    def _pick(random: Random, value: Any) -> Any:
+        """Get given value, or random value within it if (min, max) range."""
+        if isinstance(value, tuple):
+            return (
+                random.randint(*value)
+                if isinstance(value[0], int)
+                else random.uniform(*value)
+            )
+        return value
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Stub Chat
+# ----------------------------------------------------------------------------------------------------
+class StubChat:
+    """Offline chat session of stub backend, recording history like **AsyncChat**."""
+
+    def __init__(self, backend: StubBackend, history: list[Content] | None = None):
+        self._backend = backend
+        self._curated_history: list[Content] = list(history or [])
+
+    async def send_message(
+        self, message: list[Part] | Part | str, config: Any = None
+    ) -> GenerateContentResponse:
+        content = self._content(message)
+        response = await self._backend.respond(self._curated_history + [content])
+        self._curated_history += [content, response.candidates[0].content]  # type: ignore
+        return response
+
+    async def send_message_stream(
+        self, message: list[Part] | Part | str, config: Any = None
+    ) -> AsyncIterator[GenerateContentResponse]:
+        content = self._content(message)
+        response = await self._backend.respond(self._curated_history + [content])
+
+        async def stream() -> AsyncIterator[GenerateContentResponse]:
+            text = response.text or ""
+            chunk_chars = self._backend.chunk_chars
+            for i in range(0, len(text), chunk_chars):
+                if i:
+                    await sleep(self._backend.chunk_latency)
+                is_last = i + chunk_chars >= len(text)
+                yield GenerateContentResponse(
+                    candidates=[
+                        Candidate(
+                            content=Content(
+                                role="model",
+                                parts=[Part(text=text[i : i + chunk_chars])],
+                            )
+                        )
+                    ],
+                    usage_metadata=response.usage_metadata if is_last else None,
+                )
+            self._curated_history += [content, response.candidates[0].content]  # type: ignore
+
+        return stream()
+
+    @staticmethod
+    def _content(message: list[Part] | Part | str) -> Content:
+        parts = message if isinstance(message, list) else [message]
+        return Content(
+            role="user",
+            parts=[
+                Part(text=part) if isinstance(part, str) else part for part in parts
+            ],
+        )
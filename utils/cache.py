@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from threading import RLock
+from time import monotonic
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Act Cache
+# ----------------------------------------------------------------------------------------------------
+class ActCache(Generic[K, V]):
+    """Thread-safe in-memory key-value cache bounded by least-recently-used (LRU) eviction and optional time-to-live (TTL)."""
+
+    def __init__(self, max_size: int = 128, ttl: float | None = None):
+        """
+        :param int max_size: Maximum number of items kept. Least recently used items are evicted first.
+        :param float ttl: Seconds an item stays valid after being set. If none, items never expire.
+        """
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: K) -> bool:
+        with self._lock:
+            item = self._items.get(key)
+            return item is not None and item[1] > monotonic()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        """Get item of given key and mark it as recently used. If nonexistent or expired, get given default."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[1] <= monotonic():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: K, value: V) -> V:
+        """Set item of given key and evict least recently used items if full. Get given value."""
+        with self._lock:
+            expires_at = (
+                monotonic() + self.ttl if self.ttl is not None else float("inf")
+            )
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            return value
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        """Remove and get item of given key. If nonexistent, get given default."""
+        with self._lock:
+            item = self._items.pop(key, None)
+            return item[0] if item is not None else default
+
+    def keys(self) -> list[K]:
+        """Get snapshot of all keys, including expired ones not yet evicted."""
+        with self._lock:
+            return list(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
@@ -1,14 +1,20 @@
+import json
 import os
+from asyncio import Task, TimeoutError, create_task, shield, to_thread
+from collections import OrderedDict
+from hashlib import sha256
 from io import BytesIO
 from mimetypes import guess_file_type
-from typing import Any, Self
+from typing import Any, ClassVar, Self
 from urllib.parse import urlparse
 
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
 from filetype import guess_mime
 from pydantic import BaseModel, StringConstraints
 from requests import get
 from typing_extensions import Annotated
 
+from utils.cache import ActCache
 from utils.log import logger
 
 NonEmptyStr = Annotated[str, StringConstraints(min_length=1, strip_whitespace=True)]
@@ -27,6 +33,10 @@ class ActFile(BaseModel):
 
     _default_name = "__unnamed__.bin"
     _type_category = ""
+    _session: ClassVar[ClientSession | None] = None  # Shared by all async fetches
+
+    FETCH_TIMEOUT: ClassVar[float] = 10.0  # sec
+    FETCH_CHUNK_SIZE: ClassVar[int] = 65536  # 64 KB
 
     def model_post_init(self, context: Any):
         if not self.mime_type:
@@ -103,3 +113,276 @@ class ActFile(BaseModel):
                 data = f.read()
                 name = os.path.basename(file_path_or_url)
                 return cls(data=data, name=name)
+
+    @classmethod
+    async def fetch(
+        cls, url: str, max_size: int | None = None, timeout: float | None = None
+    ) -> Self | None:
+        """Fetch file from given url without blocking. Abort as soon as it exceeds given max size (bytes).
+        If failed, timed out, or too large, get None."""
+        data = await cls.fetch_data(url, max_size, timeout)
+        return cls(data=data, name=cls.url_name(url)) if data is not None else None
+
+    @classmethod
+    async def fetch_data(
+        cls, url: str, max_size: int | None = None, timeout: float | None = None
+    ) -> bytes | None:
+        """Fetch raw bytes from given url without blocking. Abort as soon as it exceeds given max size (bytes).
+        If failed, timed out, or too large, get None."""
+        try:
+            session = cls._get_session()
+            async with session.get(
+                url, timeout=ClientTimeout(total=timeout or cls.FETCH_TIMEOUT)
+            ) as response:
+                response.raise_for_status()
+                if max_size is not None and (response.content_length or 0) > max_size:
+                    return None
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(cls.FETCH_CHUNK_SIZE):
+                    data += chunk
+                    if max_size is not None and len(data) > max_size:
+                        return None
+        except (ClientError, TimeoutError) as e:
+            log.warning(f"File fetch from {url} failed: {e!r}")
+            return None
+        return bytes(data)
+
+    @staticmethod
+    def url_name(url: str) -> str:
+        """Get file name from given url path."""
+        return os.path.basename(urlparse(url).path)
+
+    @classmethod
+    def _get_session(cls) -> ClientSession:
+        """Get shared HTTP session (connection pool). If none or closed, create."""
+        if not ActFile._session or ActFile._session.closed:
+            ActFile._session = ClientSession(connector=TCPConnector(limit=32))
+        return ActFile._session
+
+    @classmethod
+    async def close_session(cls):
+        """Close shared HTTP session, if open."""
+        if ActFile._session and not ActFile._session.closed:
+            await ActFile._session.close()
+        ActFile._session = None
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Act File Cache
+# ----------------------------------------------------------------------------------------------------
+class ActFileCache:
+    """Content-addressed cache of fetched files, kept in memory and on disk, each bounded by total size with
+    least-recently-used (LRU) eviction. Urls map to content digests, so identical files are stored and mime-sniffed once.
+    Url mappings of files on disk are persisted alongside them, so the disk cache still hits after a restart.
+    """
+
+    URLS_DIRNAME = "urls"  # Subdirectory of url mappings, one file per url hash
+
+    def __init__(
+        self,
+        dirpath: str = ".cache/files",
+        max_memory_size: int = 33554432,  # 32 MB
+        max_disk_size: int = 268435456,  # 256 MB
+        max_urls: int = 4096,
+    ):
+        """
+        :param str dirpath: Directory of cached files on disk. Created if non-existent.
+        :param int max_memory_size: Maximum total bytes of files kept in memory.
+        :param int max_disk_size: Maximum total bytes of files kept on disk.
+        :param int max_urls: Maximum number of urls (and sniffed mime types) remembered.
+        """
+        self.dirpath = dirpath
+        self.max_memory_size = max_memory_size
+        self.max_disk_size = max_disk_size
+        self.hits = 0
+        self.misses = 0
+        # Url -> (content digest, file name)
+        self._urls: ActCache[str, tuple[str, str]] = ActCache(max_urls)
+        self._mime_types: ActCache[str, str] = ActCache(max_urls)  # Digest -> mime
+        self._memory: OrderedDict[str, bytes] = OrderedDict()  # Digest -> data
+        self._memory_size = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()  # Digest -> size
+        self._disk_size = 0
+        self._pending: dict[tuple[str, int | None], Task[ActFile | None]] = {}
+        self._load_disk_index()
+        self._load_url_index()
+
+    def __len__(self) -> int:
+        return len(self._disk.keys() | self._memory.keys())
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def memory_size(self) -> int:
+        return self._memory_size
+
+    @property
+    def disk_size(self) -> int:
+        return self._disk_size
+
+    # ----------------------------------------------------------------------------------------------------
+
+    async def fetch(self, url: str, max_size: int | None = None) -> ActFile | None:
+        """Get file of given url from cache. If not cached, fetch and cache it.
+        Concurrent fetches of same url are shared. If failed, timed out, or larger than given max size (bytes), get None.
+        """
+        if entry := self._urls.get(url):
+            digest, name = entry
+            data = self._memory_get(digest) or await self._disk_get(digest)
+            if data is not None:
+                self.hits += 1
+                if max_size is not None and len(data) > max_size:
+                    return None
+                return self._create_file(digest, data, name)
+        key = (url, max_size)
+        if not (task := self._pending.get(key)):
+            task = self._pending[key] = create_task(self._fetch(url, max_size))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await shield(task)  # Cancelling a waiter does not cancel others' fetch
+
+    async def _fetch(self, url: str, max_size: int | None) -> ActFile | None:
+        self.misses += 1
+        data = await ActFile.fetch_data(url, max_size)
+        if data is None:
+            return None
+        digest = sha256(data).hexdigest()
+        name = ActFile.url_name(url)
+        self._urls.set(url, (digest, name))
+        self._memory_set(digest, data)
+        await self._disk_set(digest, data)
+        if digest in self._disk:
+            try:
+                await to_thread(self._write_url, url, digest, name)
+            except OSError as e:
+                log.warning(f"File cache url write to '{self.dirpath}' failed: {e!r}")
+        return self._create_file(digest, data, name)
+
+    def _create_file(self, digest: str, data: bytes, name: str) -> ActFile:
+        """Create file of given content, sniffing its mime type only if not memoized."""
+        file = ActFile(data=data, mime_type=self._mime_types.get(digest), name=name)
+        if file.mime_type:
+            self._mime_types.set(digest, file.mime_type)
+        return file
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def _memory_get(self, digest: str) -> bytes | None:
+        data = self._memory.get(digest)
+        if data is not None:
+            self._memory.move_to_end(digest)
+        return data
+
+    def _memory_set(self, digest: str, data: bytes):
+        if digest in self._memory or len(data) > self.max_memory_size:
+            return
+        self._memory[digest] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.max_memory_size:
+            _, evicted_data = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted_data)
+
+    async def _disk_get(self, digest: str) -> bytes | None:
+        if digest not in self._disk:
+            return None
+        self._disk.move_to_end(digest)
+        try:
+            data = await to_thread(self._read, os.path.join(self.dirpath, digest))
+        except OSError:  # Removed externally
+            self._disk_size -= self._disk.pop(digest, 0)
+            return None
+        self._memory_set(digest, data)
+        return data
+
+    async def _disk_set(self, digest: str, data: bytes):
+        if digest in self._disk or len(data) > self.max_disk_size:
+            return
+        evicted_digestes = []
+        self._disk[digest] = len(data)
+        self._disk_size += len(data)
+        while self._disk_size > self.max_disk_size:
+            evicted_digest, evicted_size = self._disk.popitem(last=False)
+            self._disk_size -= evicted_size
+            evicted_digestes.append(evicted_digest)
+        try:
+            await to_thread(self._write, digest, data, evicted_digestes)
+        except OSError as e:
+            log.warning(f"File cache write to '{self.dirpath}' failed: {e!r}")
+            self._disk_size -= self._disk.pop(digest, 0)
+
+    def _load_disk_index(self):
+        """Index cached files on disk, least recently used first."""
+        os.makedirs(self.dirpath, exist_ok=True)
+        entries = [
+            entry
+            for entry in os.scandir(self.dirpath)
+            if entry.is_file() and len(entry.name) == 64  # Sha256 hex digest
+        ]
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            self._disk[entry.name] = entry.stat().st_size
+            self._disk_size += self._disk[entry.name]
+        while self._disk_size > self.max_disk_size:
+            evicted_digest, evicted_size = self._disk.popitem(last=False)
+            self._disk_size -= evicted_size
+            self._remove(os.path.join(self.dirpath, evicted_digest))
+        log.info(f"File cache loaded: {len(self._disk)} files, {self._disk_size} bytes")
+
+    def _load_url_index(self):
+        """Load url mappings of cached files on disk, least recently used first. Remove stale or excess ones."""
+        urls_dirpath = os.path.join(self.dirpath, self.URLS_DIRNAME)
+        os.makedirs(urls_dirpath, exist_ok=True)
+        entries = sorted(
+            (entry for entry in os.scandir(urls_dirpath) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        for i, entry in enumerate(entries):
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    record = json.load(f)
+                url, digest, name = record["url"], record["digest"], record["name"]
+            except (OSError, ValueError, KeyError):
+                url = digest = name = None
+            if digest not in self._disk or i < len(entries) - self._urls.max_size:
+                self._remove(entry.path)  # File evicted, unreadable, or url forgotten
+                continue
+            self._urls.set(url, (digest, name))  # type: ignore
+        log.info(f"File cache urls loaded: {len(self._urls)} urls")
+
+    # ----------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def _read(filepath: str) -> bytes:
+        """Read file of given path and mark it as recently used."""
+        with open(filepath, "rb") as f:
+            data = f.read()
+        os.utime(filepath)
+        return data
+
+    def _write(self, digest: str, data: bytes, evicted_digestes: list[str]):
+        """Write file of given digest atomically and remove given evicted files."""
+        filepath = os.path.join(self.dirpath, digest)
+        os.makedirs(self.dirpath, exist_ok=True)
+        with open(f"{filepath}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{filepath}.tmp", filepath)
+        for evicted_digest in evicted_digestes:
+            self._remove(os.path.join(self.dirpath, evicted_digest))
+
+    def _write_url(self, url: str, digest: str, name: str):
+        """Write url mapping of given url atomically, to file named by url hash."""
+        filepath = os.path.join(
+            self.dirpath, self.URLS_DIRNAME, sha256(url.encode()).hexdigest()
+        )
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(f"{filepath}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"url": url, "digest": digest, "name": name}, f)
+        os.replace(f"{filepath}.tmp", filepath)
+
+    @staticmethod
+    def _remove(filepath: str):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
@@ -162,3 +162,19 @@ def text_csv(data: dict | list[dict], replace_newline: str | None = None) -> str
         writer.writerows(data)
         text = output.getvalue()
     return replace_newline.join(text.splitlines()) if replace_newline else text
+
+
+def text_csv_lines(data: list[dict]) -> list[str]:
+    """Convert given dictionaries list to CSV lines (header first), newlines within values replaced by spaces."""
+    if not data:
+        return []
+    return [",".join(data[0].keys()), *(text_csv_row(item, " ") for item in data)]
+
+
+def text_csv_row(data: dict, replace_newline: str | None = None) -> str:
+    """Convert given dictionary to CSV row string (without header), as written by text_csv."""
+    with StringIO() as output:
+        writer = DictWriter(output, fieldnames=data.keys())
+        writer.writerow(data)
+        text = output.getvalue()
+    return replace_newline.join(text.splitlines()) if replace_newline else text
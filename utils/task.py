@@ -1,13 +1,15 @@
 from asyncio import Task, create_task, sleep
 from inspect import signature
+from math import ceil
 from time import time
-from typing import Any, Awaitable, Callable, Dict, Self
+from typing import Any, Awaitable, Callable, Dict, Generic, Self, TypeVar
 
 from pydantic import BaseModel
 
 from utils.log import logger
 
 log = logger(__name__)
+K = TypeVar("K")
 
 
 # ----------------------------------------------------------------------------------------------------
@@ -131,3 +133,65 @@ class ActTaskManager:
     def is_running(self, id: Any) -> bool:
         """Check if task of given id is running."""
         return id in self._tasks
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Act Timing Wheel
+# ----------------------------------------------------------------------------------------------------
+class ActTimingWheel(Generic[K]):
+    """Timing wheel of keys due after a delay, bucketed by tick so many keys are tracked by one periodic task
+    (instead of one sleeping task per key). Each key is due at most once."""
+
+    def __init__(self, tick: float = 60.0):
+        """
+        :param float tick: Seconds per bucket. Keys fall due up to a tick late.
+        """
+        self.tick = tick
+        self._buckets: dict[int, set[K]] = {}  # Tick index -> keys due
+        self._due_ticks: dict[K, int] = {}  # Key -> tick index
+        self._last_tick = self._tick_index(time())
+
+    def __len__(self) -> int:
+        return len(self._due_ticks)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._due_ticks
+
+    # ----------------------------------------------------------------------------------------------------
+
+    def add(self, key: K, delay: float):
+        """Add given key due after given delay (sec). If already added, reschedule it."""
+        self.discard(key)
+        tick_index = max(ceil((time() + delay) / self.tick), self._last_tick + 1)
+        self._buckets.setdefault(tick_index, set()).add(key)
+        self._due_ticks[key] = tick_index
+
+    def discard(self, key: K):
+        """Remove given key, if added."""
+        tick_index = self._due_ticks.pop(key, None)
+        if tick_index is not None:
+            bucket = self._buckets[tick_index]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[tick_index]
+
+    def pop_due(self) -> list[K]:
+        """Remove and get keys due by now (including missed earlier ticks)."""
+        now_tick = self._tick_index(time())
+        keys: list[K] = []
+        for tick_index in range(self._last_tick + 1, now_tick + 1):
+            for key in self._buckets.pop(tick_index, ()):
+                del self._due_ticks[key]
+                keys.append(key)
+        self._last_tick = max(self._last_tick, now_tick)
+        return keys
+
+    def time_left(self, key: K) -> float | None:
+        """Get seconds until given key is due. If not added, get None."""
+        tick_index = self._due_ticks.get(key)
+        if tick_index is None:
+            return None
+        return max(0.0, tick_index * self.tick - time())
+
+    def _tick_index(self, at: float) -> int:
+        return int(at // self.tick)
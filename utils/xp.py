@@ -1,4 +1,6 @@
 import re
+from re import Pattern
+from typing import ClassVar, Iterable
 
 
 # ----------------------------------------------------------------------------------------------------
@@ -52,48 +54,110 @@ class Experience:
     # Penalty multiplier applied to word XP if MAX_CONSECUTIVE_CHARS is exceeded
     CONSECUTIVE_CHARS_PENALTY_MULTIPLIER: float = 0.1
 
+    # --- Compiled Patterns ---
+
+    URL_PATTERN: ClassVar[Pattern] = re.compile(r"https?://\S+")
+    CODE_BLOCK_PATTERN: ClassVar[Pattern] = re.compile(r"```.*?```", re.DOTALL)
+    INLINE_CODE_PATTERN: ClassVar[Pattern] = re.compile(r"`.*?`")
+    # Alphanumeric runs. Underscores & any other chars (formatting, punctuation, emojis, whitespace) separate words.
+    # Mention ids & custom emoji names count as words, as their ">" is stripped as a quote marker before removal
+    WORD_PATTERN: ClassVar[Pattern] = re.compile(r"[^\W_]+")
+    _consecutive_patterns: ClassVar[dict[int, Pattern]] = (
+        {}
+    )  # Max consecutive chars -> pattern
+
     @classmethod
-    def _clean_message_content(cls, content: str) -> str:
+    def _tokenize(cls, content: str) -> list[str]:
         """
-        Remove URLs, common markdown/formatting, mentions, custom emojis, excessive punctuation,
-        and normalize whitespace to prepare text for word counting and analysis.
+        Split message content into lowercase words, skipping URLs & code, in a single pass
+        (URL & code patterns only run if their markers are present).
 
         Args:
             content: The raw message content string.
 
         Returns:
-            A cleaned string suitable for word analysis.
+            The words, in order.
         """
-        # Lowercase for consistent processing
         text = content.lower()
+        if "http" in text:
+            text = cls.URL_PATTERN.sub(" ", text)
+        if "`" in text:
+            if "```" in text:
+                text = cls.CODE_BLOCK_PATTERN.sub(" ", text)
+            text = cls.INLINE_CODE_PATTERN.sub(" ", text)
+        return cls.WORD_PATTERN.findall(text)
 
-        # Remove URLs first
-        text = re.sub(r"https?://\S+", " ", text)
-
-        # Remove common markdown/formatting (code blocks, bold, italics, etc.)
-        # Note: This is a best-effort removal for common patterns.
-        text = re.sub(
-            r"```.*?```", " ", text, flags=re.DOTALL
-        )  # Multi-line code blocks
-        text = re.sub(r"`.*?`", " ", text)  # Inline code
-        text = re.sub(r"(\*\*|__|\*|_|~~|\|\||>)\s*", " ", text)  # Formatting markers
-
-        # Remove platform-specific elements (mentions, custom emojis)
-        # These regex are common patterns but might need adjustment for other platforms
-        text = re.sub(
-            r"<a?:\w+:\d+>", " ", text
-        )  # Discord custom emojis (<:name:id> or <a:name:id>)
-        text = re.sub(r"<@!?&?#?\d+>", " ", text)  # Discord mentions/roles/channels
+    @classmethod
+    def _consecutive_pattern(cls) -> Pattern:
+        """Get compiled pattern of any character repeated MAX_CONSECUTIVE_CHARS or more times."""
+        pattern = cls._consecutive_patterns.get(cls.MAX_CONSECUTIVE_CHARS)
+        if not pattern:
+            pattern = cls._consecutive_patterns[cls.MAX_CONSECUTIVE_CHARS] = re.compile(
+                r"(.)\1{" + str(cls.MAX_CONSECUTIVE_CHARS - 1) + r",}"
+            )
+        return pattern
 
-        # Replace punctuation (except apostrophes within words) with spaces
-        text = re.sub(r"[^\w\s']", " ", text)
-        # Remove apostrophes that are not within words
-        text = re.sub(r"(?<!\w)'|'(?!\w)", " ", text)
+    @classmethod
+    def _calculate_word_xp(cls, content: str) -> float:
+        """
+        Calculate the (potentially penalized) XP of the words of given message content.
 
-        # Normalize whitespace (replace multiple spaces/tabs/newlines with a single space)
-        text = re.sub(r"\s+", " ", text).strip()
+        Args:
+            content: The text content of the message.
 
-        return text
+        Returns:
+            The word XP.
+        """
+        # --- 1. Analyze Content for Words ---
+        # Only process content if it actually exists
+        if not content or not content.strip():
+            return 0.0
+        words = cls._tokenize(content)
+
+        # Filter words by minimum length
+        valid_words = [word for word in words if len(word) >= cls.MIN_WORD_LENGTH]
+        valid_word_count = len(valid_words)
+
+        # Apply word count cap *before* calculating XP for words
+        capped_word_count = (
+            min(valid_word_count, cls.XP_WORD_COUNT_CAP)
+            if cls.XP_WORD_COUNT_CAP > 0
+            else valid_word_count
+        )
+        if capped_word_count <= 0:
+            return 0.0
+
+        # Initial word XP calculation
+        word_xp = capped_word_count * cls.XP_PER_WORD
+
+        # --- 2. Apply Penalties to Word XP based on content quality ---
+
+        # Penalty 1: Low Character Variety
+        # Cleaned content is words joined by single separators (space or inner apostrophe)
+        alnum_chars = "".join(words)
+        total_alnum_chars = len(alnum_chars)
+        if cls.LOW_VARIETY_THRESHOLD > 0 and total_alnum_chars + len(words) - 1 > 10:
+            variety_ratio = len(set(alnum_chars)) / total_alnum_chars
+            if variety_ratio < cls.LOW_VARIETY_THRESHOLD:
+                word_xp *= cls.LOW_VARIETY_PENALTY_MULTIPLIER
+
+        # Penalty 2: Low Unique Word Ratio
+        if (
+            word_xp > 0
+            and cls.LOW_UNIQUE_WORD_RATIO_THRESHOLD > 0
+            and valid_word_count > 5
+        ):  # Need enough words
+            unique_ratio = len(set(valid_words)) / valid_word_count
+            if unique_ratio < cls.LOW_UNIQUE_WORD_RATIO_THRESHOLD:
+                word_xp *= cls.LOW_UNIQUE_WORD_PENALTY_MULTIPLIER
+
+        # Penalty 3: Excessive Consecutive Identical Characters
+        # Check original content for sequences like "ggggggg"
+        if word_xp > 0 and cls.MAX_CONSECUTIVE_CHARS > 0:
+            if cls._consecutive_pattern().search(content):
+                word_xp *= cls.CONSECUTIVE_CHARS_PENALTY_MULTIPLIER
+
+        return word_xp
 
     @classmethod
     def calculate_reward(
@@ -117,72 +181,46 @@ class Experience:
         Returns:
             The calculated integer XP reward (guaranteed to be at least 1).
         """
-        xp_reward = float(cls.XP_PER_MESSAGE_BASE)  # Start with float for penalties
-        word_xp = 0.0
-        original_content = content  # Keep original for consecutive char check
+        return cls._finalize_reward(
+            cls._calculate_word_xp(content),
+            attachment_count,
+            embed_count,
+            sticker_count,
+        )
 
-        # --- 1. Analyze Content for Words ---
-        # Only process content if it actually exists
-        if content and content.strip():
-            cleaned_content = cls._clean_message_content(content)
-            if cleaned_content:  # Ensure cleaning didn't remove everything
-                # \b ensures whole words, \w+ matches alphanumeric sequences
-                all_words = re.findall(r"\b\w+\b", cleaned_content)
-
-                # Filter words by minimum length
-                valid_words = [
-                    word for word in all_words if len(word) >= cls.MIN_WORD_LENGTH
-                ]
-                valid_word_count = len(valid_words)
-
-                # Apply word count cap *before* calculating XP for words
-                capped_word_count = (
-                    min(valid_word_count, cls.XP_WORD_COUNT_CAP)
-                    if cls.XP_WORD_COUNT_CAP > 0
-                    else valid_word_count
+    @classmethod
+    def calculate_rewards(
+        cls, messages: Iterable[tuple[str, int, int, int]]
+    ) -> list[int]:
+        """
+        Calculate XP rewards of many messages at once (e.g. history backfill).
+        Word XP of identical contents (e.g. repeated spam) is only calculated once.
+
+        Args:
+            messages: The (content, attachment count, embed count, sticker count) tuples of the messages.
+
+        Returns:
+            The calculated integer XP rewards, in order.
+        """
+        word_xps: dict[str, float] = {}
+        rewards = []
+        for content, attachment_count, embed_count, sticker_count in messages:
+            word_xp = word_xps.get(content)
+            if word_xp is None:
+                word_xp = word_xps[content] = cls._calculate_word_xp(content)
+            rewards.append(
+                cls._finalize_reward(
+                    word_xp, attachment_count, embed_count, sticker_count
                 )
+            )
+        return rewards
 
-                # Initial word XP calculation
-                if capped_word_count > 0:
-                    word_xp = capped_word_count * cls.XP_PER_WORD
-
-                    # --- 2. Apply Penalties to Word XP based on content quality ---
-
-                    # Penalty 1: Low Character Variety
-                    if (
-                        cls.LOW_VARIETY_THRESHOLD > 0 and len(cleaned_content) > 10
-                    ):  # Check on cleaned content
-                        alnum_chars = [c for c in cleaned_content if c.isalnum()]
-                        total_alnum_chars = len(alnum_chars)
-                        if total_alnum_chars > 0:
-                            unique_alnum_chars = len(set(alnum_chars))
-                            variety_ratio = unique_alnum_chars / total_alnum_chars
-                            if variety_ratio < cls.LOW_VARIETY_THRESHOLD:
-                                # print(f"Applying low variety penalty ({variety_ratio:.2f} < {cls.LOW_VARIETY_THRESHOLD})") # Debug
-                                word_xp *= cls.LOW_VARIETY_PENALTY_MULTIPLIER
-
-                    # Penalty 2: Low Unique Word Ratio
-                    if (
-                        word_xp > 0
-                        and cls.LOW_UNIQUE_WORD_RATIO_THRESHOLD > 0
-                        and valid_word_count > 5
-                    ):  # Need enough words
-                        unique_valid_words = len(set(valid_words))
-                        unique_ratio = unique_valid_words / valid_word_count
-                        if unique_ratio < cls.LOW_UNIQUE_WORD_RATIO_THRESHOLD:
-                            # print(f"Applying low unique word penalty ({unique_ratio:.2f} < {cls.LOW_UNIQUE_WORD_RATIO_THRESHOLD})") # Debug
-                            word_xp *= cls.LOW_UNIQUE_WORD_PENALTY_MULTIPLIER
-
-                    # Penalty 3: Excessive Consecutive Identical Characters
-                    # Check original content for sequences like "ggggggg"
-                    if word_xp > 0 and cls.MAX_CONSECUTIVE_CHARS > 0:
-                        # Find any character repeated MAX_CONSECUTIVE_CHARS or more times
-                        if matches := re.findall(
-                            r"(.)\1{" + str(cls.MAX_CONSECUTIVE_CHARS - 1) + r",}",
-                            original_content,
-                        ):
-                            # print(f"Applying consecutive char penalty (found sequences like {matches[0]*cls.MAX_CONSECUTIVE_CHARS}...)") # Debug
-                            word_xp *= cls.CONSECUTIVE_CHARS_PENALTY_MULTIPLIER
+    @classmethod
+    def _finalize_reward(
+        cls, word_xp: float, attachment_count: int, embed_count: int, sticker_count: int
+    ) -> int:
+        """Get total integer XP reward of given word XP, attachments, embeds, and stickers."""
+        xp_reward = float(cls.XP_PER_MESSAGE_BASE)  # Start with float for penalties
 
         # Add potentially penalized word XP to total
         xp_reward += word_xp
@@ -190,14 +228,9 @@ class Experience:
         # --- 3. Add XP for Attachments, Embeds, and Stickers ---
         xp_reward += attachment_count * cls.XP_PER_ATTACHMENT
         xp_reward += embed_count * cls.XP_PER_EMBED
-        xp_reward += sticker_count * cls.XP_PER_STICKER  # Add sticker XP
+        xp_reward += sticker_count * cls.XP_PER_STICKER
 
         # --- 4. Finalize ---
         # Ensure at least 1 XP, even for penalized or content-less messages
         # (e.g., a message with only a sticker should get base + sticker XP)
-        final_xp = max(1, int(round(xp_reward)))
-
-        # Optional: Add detailed debug logging if needed
-        # print(f"Content='{content[:30]}' Attach={attachment_count} Embed={embed_count} Sticker={sticker_count} | Clean='{cleaned_content[:30]}' Words={valid_word_count}({capped_word_count}) WordXP={word_xp:.2f} | FinalXP={final_xp}")
-
-        return final_xp
+        return max(1, int(round(xp_reward)))
@@ -0,0 +1,156 @@
+"""
+Microbenchmark of `Experience` message scoring, against the previous multi-pass implementation (kept here as
+reference), checking both give identical rewards.
+
+Usage:
+    python -m z_test.bench_xp [--messages 20000] [--repeat 5] [--seed 0]
+"""
+
+import re
+from argparse import ArgumentParser
+from random import Random
+from timeit import repeat
+
+from utils.xp import Experience
+
+WORDS = (
+    "hello there what's up lol gg wp honestly think that game was wild don't know "
+    "maybe tomorrow we play again nice cool idk brb afk xp gold level duel shop"
+).split()
+EXTRAS = [
+    "https://example.com/some/path?x=1",
+    "`inline code`",
+    "```py\nprint('code block')\n```",
+    "**bold**",
+    "__underline__",
+    "||spoiler||",
+    "> quote",
+    "<@123456789012345678>",
+    "<:pepe_hands:987654321098765432>",
+    "!!!",
+    "hahahahahaha",
+    "noooooooooo",
+]
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Reference
+# ----------------------------------------------------------------------------------------------------
+def reference_reward(
+    content: str, attachment_count=0, embed_count=0, sticker_count=0
+) -> int:
+    """Previous multi-pass implementation of **Experience.calculate_reward**."""
+    xp = Experience
+    xp_reward = float(xp.XP_PER_MESSAGE_BASE)
+    word_xp = 0.0
+    if content and content.strip():
+        text = content.lower()
+        text = re.sub(r"https?://\S+", " ", text)
+        text = re.sub(r"```.*?```", " ", text, flags=re.DOTALL)
+        text = re.sub(r"`.*?`", " ", text)
+        text = re.sub(r"(\*\*|__|\*|_|~~|\|\||>)\s*", " ", text)
+        text = re.sub(r"<a?:\w+:\d+>", " ", text)
+        text = re.sub(r"<@!?&?#?\d+>", " ", text)
+        text = re.sub(r"[^\w\s']", " ", text)
+        text = re.sub(r"(?<!\w)'|'(?!\w)", " ", text)
+        cleaned_content = re.sub(r"\s+", " ", text).strip()
+        if cleaned_content:
+            all_words = re.findall(r"\b\w+\b", cleaned_content)
+            valid_words = [
+                word for word in all_words if len(word) >= xp.MIN_WORD_LENGTH
+            ]
+            valid_word_count = len(valid_words)
+            capped_word_count = (
+                min(valid_word_count, xp.XP_WORD_COUNT_CAP)
+                if xp.XP_WORD_COUNT_CAP > 0
+                else valid_word_count
+            )
+            if capped_word_count > 0:
+                word_xp = capped_word_count * xp.XP_PER_WORD
+                if xp.LOW_VARIETY_THRESHOLD > 0 and len(cleaned_content) > 10:
+                    alnum_chars = [c for c in cleaned_content if c.isalnum()]
+                    if alnum_chars:
+                        if (
+                            len(set(alnum_chars)) / len(alnum_chars)
+                            < xp.LOW_VARIETY_THRESHOLD
+                        ):
+                            word_xp *= xp.LOW_VARIETY_PENALTY_MULTIPLIER
+                if (
+                    word_xp > 0
+                    and xp.LOW_UNIQUE_WORD_RATIO_THRESHOLD > 0
+                    and valid_word_count > 5
+                ):
+                    if (
+                        len(set(valid_words)) / valid_word_count
+                        < xp.LOW_UNIQUE_WORD_RATIO_THRESHOLD
+                    ):
+                        word_xp *= xp.LOW_UNIQUE_WORD_PENALTY_MULTIPLIER
+                if word_xp > 0 and xp.MAX_CONSECUTIVE_CHARS > 0:
+                    if re.findall(
+                        r"(.)\1{" + str(xp.MAX_CONSECUTIVE_CHARS - 1) + r",}", content
+                    ):
+                        word_xp *= xp.CONSECUTIVE_CHARS_PENALTY_MULTIPLIER
+    xp_reward += word_xp
+    xp_reward += attachment_count * xp.XP_PER_ATTACHMENT
+    xp_reward += embed_count * xp.XP_PER_EMBED
+    xp_reward += sticker_count * xp.XP_PER_STICKER
+    return max(1, int(round(xp_reward)))
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Benchmark
+# ----------------------------------------------------------------------------------------------------
+def generate_messages(messages_count: int, seed=0) -> list[tuple[str, int, int, int]]:
+    """Generate synthetic chat messages as (content, attachment count, embed count, sticker count) tuples."""
+    random = Random(seed)
+    messages = []
+    for _ in range(messages_count):
+        parts = random.choices(WORDS, k=random.randint(0, 40))
+        if random.random() < 0.3:
+            parts.insert(random.randint(0, len(parts)), random.choice(EXTRAS))
+        content = " ".join(parts)
+        if random.random() < 0.2:
+            content = content.capitalize() + random.choice(["!", "?", "...", " :)"])
+        messages.append(
+            (
+                content,
+                int(random.random() < 0.1),
+                int(random.random() < 0.1),
+                int(random.random() < 0.05),
+            )
+        )
+    return messages
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark XP message scoring.")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    messages = generate_messages(args.messages, args.seed)
+
+    # Check identical rewards
+    expected = [reference_reward(*message) for message in messages]
+    assert [Experience.calculate_reward(*message) for message in messages] == expected
+    assert Experience.calculate_rewards(messages) == expected
+
+    # Time per message cost (best of repeats)
+    runs = {
+        "reference": lambda: [reference_reward(*message) for message in messages],
+        "calculate_reward": lambda: [
+            Experience.calculate_reward(*message) for message in messages
+        ],
+        "calculate_rewards": lambda: Experience.calculate_rewards(messages),
+    }
+    reference_time = 0.0
+    for name, run in runs.items():
+        run_time = min(repeat(run, number=1, repeat=args.repeat)) / len(messages)
+        reference_time = reference_time or run_time
+        print(
+            f"{name:<18} {run_time * 1e6:8.2f} µs/message  ({reference_time / run_time:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Check that a failing `on_stream` callback (e.g. a Discord reply edit failing) does not abort a streamed AI response:
+the response is still read to end, returned & added to chat session history. Runs offline with the stub backend.
+
+Usage:
+    python -m z_test.check_ai_stream
+"""
+
+import asyncio
+
+from utils.ai import ActAi
+from utils.ai_stub import StubBackend
+
+
+async def main():
+    backend = StubBackend(latency=0.01, chunk_latency=0.0, response_chars=300)
+    ai = ActAi(api_key="stub", backend=backend)
+    calls_count = 0
+
+    async def on_stream(text: str):
+        nonlocal calls_count
+        calls_count += 1
+        raise RuntimeError("Simulated message edit failure.")
+
+    response_text = await ai.prompt(1, "hello", on_stream=on_stream)
+    assert response_text and len(response_text) == 300, response_text
+    assert calls_count > 1, calls_count  # Kept streaming after first failure
+    assert ai.history_length(1) == 2, ai.history_length(1)  # Exchange in history
+    print(f"OK: {calls_count} failed stream callbacks, response & history kept.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
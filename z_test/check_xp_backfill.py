@@ -0,0 +1,149 @@
+"""
+Check that an xp backfill interrupted right after writing a batch of actors (before checkpointing it) resumes without
+applying that batch twice: resumed actors xp & gold equal those of an uninterrupted backfill.
+
+Usage:
+    python -m z_test.check_xp_backfill [--db-uri mongodb://localhost:1717]
+
+A MongoDB server is needed (e.g. `task db`); a throwaway database is used and dropped afterwards.
+If none is reachable (e.g. on CI), check is skipped.
+"""
+
+import asyncio
+from argparse import ArgumentParser
+from random import Random
+
+from discord import TextChannel
+from pymongo.errors import ServerSelectionTimeoutError
+
+from bot.xp_backfill import XpBackfill
+from db.actor import Actor
+from db.main import ActDb
+from utils.log import logger
+
+log = logger(__name__)
+DB_TIMEOUT = 3000  # ms
+WORDS = "hello there what's up game gold level duel shop nice cool".split()
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Fake Discord Objects
+# ----------------------------------------------------------------------------------------------------
+class FakeAuthor:
+    def __init__(self, id: int):
+        self.id = id
+        self.name = self.display_name = f"user_{id}"
+        self.bot = False
+
+
+class FakeMessage:
+    def __init__(self, id: int, author: FakeAuthor, content: str):
+        self.id = id
+        self.author = author
+        self.content = content
+        self.attachments = self.embeds = self.stickers = []
+
+
+class FakeChannel(TextChannel):
+    def __init__(self, id: int, messages: list[FakeMessage]):
+        self.id = id
+        self.messages = messages
+
+    async def history(self, limit=None, after=None, before=None, oldest_first=True):  # type: ignore
+        for message in self.messages:
+            if (not after or message.id > after.id) and message.id < before.id:
+                yield message
+
+
+class FakeGuild:
+    def __init__(self, channels: list[FakeChannel]):
+        self.id = 1
+        self.name = "guild_1"
+        self.text_channels = channels
+        self._channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, id: int):
+        return self._channels.get(id)
+
+    def get_member(self, id: int):
+        return None
+
+
+class Interrupted(Exception):
+    """Simulated crash."""
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Check
+# ----------------------------------------------------------------------------------------------------
+async def backfill_actors(
+    db: ActDb, guild: FakeGuild, guild_id: int, interrupt: bool
+) -> dict[int, tuple[int, int]]:
+    """Backfill given guild into database of given id (interrupted after 2nd batch write if given). Get actor id ->
+    (xp, gold)."""
+    engine = await db.get_aio_engine(guild_id, f"check_{guild_id}")
+    assert engine
+    await engine.save(Actor(id=5, xp=1000, level=3, gold=7))  # Existing actor
+    backfill = XpBackfill(engine, guild)  # type: ignore
+    backfill.WRITE_BATCH_SIZE = 10
+    if interrupt:
+        save_checkpoint = backfill.save_checkpoint
+
+        async def interrupted_save_checkpoint():
+            if backfill.checkpoint and backfill.checkpoint.applied_count >= 20:
+                raise Interrupted()  # Batch written, but not checkpointed
+            await save_checkpoint()
+
+        backfill.save_checkpoint = interrupted_save_checkpoint  # type: ignore
+        try:
+            await backfill.run(guild.text_channels)  # type: ignore
+        except Interrupted:
+            log.info("Backfill interrupted after batch write.")
+        backfill = XpBackfill(engine, guild)  # type: ignore
+        backfill.WRITE_BATCH_SIZE = 10
+        assert await backfill.load()
+    await backfill.run(guild.text_channels)  # type: ignore
+    return {actor.id: (actor.xp, actor.gold) for actor in await engine.find(Actor)}
+
+
+async def main():
+    parser = ArgumentParser(description="Check xp backfill resumes safely.")
+    parser.add_argument("--db-uri", default="mongodb://localhost:1717")
+    args = parser.parse_args()
+    try:
+        db = ActDb(
+            host=args.db_uri, name="ACT_check", serverSelectionTimeoutMS=DB_TIMEOUT
+        )
+    except ServerSelectionTimeoutError:
+        log.warning(f"No MongoDB reachable at {args.db_uri}, check skipped.")
+        return
+
+    random = Random(0)
+    authors = [FakeAuthor(id) for id in range(1, 51)]
+    messages = [
+        FakeMessage(
+            id,
+            random.choice(authors),
+            " ".join(random.choices(WORDS, k=random.randint(0, 20))),
+        )
+        for id in range(1, 3001)
+    ]
+    guild = FakeGuild([FakeChannel(10, messages)])
+    try:
+        expected = await backfill_actors(db, guild, 1, interrupt=False)
+        resumed = await backfill_actors(db, guild, 2, interrupt=True)
+        assert resumed == expected, "Resumed backfill differs from uninterrupted one."
+        engine = await db.get_aio_engine(2)
+        assert engine
+        assert not await engine.get_collection(Actor).count_documents(
+            {XpBackfill.RUN_FIELD: {"$exists": True}}
+        )
+        log.success(f"Resumed backfill of {len(resumed)} actors applied exactly once.")
+    finally:
+        for db_name in [db.name, *db.db_names.values()]:
+            db._client.drop_database(db_name)
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
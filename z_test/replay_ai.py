@@ -0,0 +1,369 @@
+"""
+Replay harness driving recorded (or generated) Discord message streams through `AiCog.on_message`,
+with the offline stub AI backend, to benchmark prompt building & reply scheduling throughput without network.
+
+Usage:
+    python -m z_test.replay_ai [RECORDING.jsonl] [--messages 500] [--speed 10] [--db-uri mongodb://localhost:1717]
+
+Recording lines (JSON):
+    {"at": 0.0, "guild_id": 1, "channel_id": 10, "author_id": 100, "author_name": "bob", "content": "hi", "mentions_bot": true}
+    - at: seconds since recording start
+    - guild_id: null for DM
+
+Messages are replayed at recorded pace divided by speed. By default, databases are kept in memory (mongomock-motor
+needed), so replay runs without any server (e.g. on CI). If a db uri is given, that MongoDB server is used instead
+(e.g. `task db`), with a throwaway database dropped afterwards.
+Replayed authors are plain users (not guild members).
+"""
+
+import asyncio
+import json
+from argparse import ArgumentParser
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from itertools import count
+from random import Random
+from statistics import mean, quantiles
+from time import monotonic
+from unittest.mock import patch
+
+from discord import ClientUser, Intents
+from pymongo.errors import ServerSelectionTimeoutError
+
+try:  # Only needed for in-memory databases
+    from mongomock import MongoClient as MemoryClient
+    from mongomock_motor import AsyncMongoMockClient as AioMemoryClient
+except ImportError:
+    MemoryClient = AioMemoryClient = None
+
+from bot.cogs.chat_cogs.ai_cog import AiCog
+from bot.main import ActBot
+from db.actor import Actor
+from db.main import ActDb
+from utils.ai import ActAi
+from utils.ai_stub import STUB_WORDS, StubBackend
+from utils.log import logger
+
+log = logger(__name__)
+DB_TIMEOUT = 3000  # ms
+message_ids = count(1_000_000)
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Replay Discord Objects
+# ----------------------------------------------------------------------------------------------------
+class ReplayUser:
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = self.display_name = name
+        self.mention = f"<@{id}>"
+        self.bot = False
+
+    def __str__(self):
+        return self.name
+
+
+class ReplayGuild:
+    def __init__(self, id: int):
+        self.id = id
+        self.name = f"guild_{id}"
+
+    def __str__(self):
+        return self.name
+
+
+class ReplayChannel:
+    def __init__(self, id: int, guild: ReplayGuild | None):
+        self.id = id
+        self.name = f"channel_{id}"
+        self.guild = guild
+        self.sent_count = 0
+
+    def __str__(self):
+        return self.name
+
+    async def history(self, limit: int | None = None):
+        return
+        yield
+
+    @asynccontextmanager
+    async def typing(self):
+        yield
+
+    async def send(self, content: str = "", **kwargs) -> "ReplayMessage":
+        self.sent_count += 1
+        return ReplayMessage(content, None, self)  # type: ignore
+
+
+class ReplayMessage:
+    def __init__(
+        self,
+        content: str,
+        author: ReplayUser,
+        channel: ReplayChannel,
+        mentions: list | None = None,
+        stats: "ReplayStats | None" = None,
+    ):
+        self.id = next(message_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.mentions = mentions or []
+        self.stickers, self.attachments, self.embeds = [], [], []
+        self.reference = None
+        self.stats = stats
+        self.created_at = monotonic()
+
+    async def reply(self, content: str = "", **kwargs) -> "ReplayMessage":
+        if self.stats:
+            self.stats.reply_latencies.append(monotonic() - self.created_at)
+        return ReplayMessage(content, None, self.channel)  # type: ignore
+
+    async def edit(self, content: str = "", **kwargs):
+        self.content = content
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Replay Stats
+# ----------------------------------------------------------------------------------------------------
+class ReplayStats:
+    def __init__(self):
+        self.messages_count = 0
+        self.mentions_count = 0
+        self.prompt_build_times: list[float] = []
+        self.reply_latencies: list[float] = []
+        self.max_queue_depth = 0
+
+    def report(self, elapsed_time: float, backend: StubBackend) -> str:
+        def percentiles(values: list[float]) -> str:
+            if len(values) < 2:
+                return f"avg {mean(values) if values else 0:.3f}s"
+            p = quantiles(values, n=100)
+            return f"avg {mean(values):.3f}s, p50 {p[49]:.3f}s, p95 {p[94]:.3f}s, max {max(values):.3f}s"
+
+        return "\n".join(
+            [
+                f"Replay finished in {elapsed_time:.2f}s",
+                f"• Messages: {self.messages_count} ({self.messages_count / elapsed_time:.1f}/s), mentions: {self.mentions_count}",
+                f"• Prompt build: {percentiles(self.prompt_build_times)}",
+                f"• Replies: {len(self.reply_latencies)}, latency {percentiles(self.reply_latencies)}",
+                f"• Model calls: {backend.calls_count}, failures: {backend.failures_count}, tokens: {backend.tokens_count}",
+                f"• Max rate limiter queue depth: {self.max_queue_depth}",
+            ]
+        )
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Recording
+# ----------------------------------------------------------------------------------------------------
+def load_recording(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def generate_recording(
+    messages_count: int,
+    guilds_count=5,
+    channels_count=3,
+    authors_count=50,
+    rate=20.0,
+    mention_chance=0.3,
+    seed=0,
+) -> list[dict]:
+    """Generate synthetic recording of given number of messages, arriving at given average rate (per sec)."""
+    random = Random(seed)
+    at = 0.0
+    recording = []
+    for _ in range(messages_count):
+        at += random.expovariate(rate)
+        guild_id = random.randint(1, guilds_count)
+        author_id = random.randint(1, authors_count)
+        recording.append(
+            {
+                "at": at,
+                "guild_id": guild_id,
+                "channel_id": guild_id * 100 + random.randint(1, channels_count),
+                "author_id": author_id,
+                "author_name": f"user_{author_id}",
+                "content": " ".join(
+                    random.choices(STUB_WORDS, k=random.randint(3, 30))
+                ),
+                "mentions_bot": random.random() < mention_chance,
+            }
+        )
+    return recording
+
+
+# ----------------------------------------------------------------------------------------------------
+# * In-Memory Database
+# ----------------------------------------------------------------------------------------------------
+class MemorySession(nullcontext):
+    """No client session, as in-memory clients have none (engines then run operations without one)."""
+
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+@contextmanager
+def memory_db_clients():
+    """Patch database clients opened meanwhile to in-memory ones."""
+
+    async def start_aio_session(*args, **kwargs):
+        return MemorySession()
+
+    with (
+        patch("db.main.MongoClient", MemoryClient),
+        patch("db.main.AsyncIOMotorClient", AioMemoryClient),
+        patch.object(MemoryClient, "start_session", lambda *_, **__: MemorySession()),
+        patch.object(AioMemoryClient, "start_session", start_aio_session, create=True),
+    ):
+        yield
+
+
+# ----------------------------------------------------------------------------------------------------
+# * Replay
+# ----------------------------------------------------------------------------------------------------
+async def replay(
+    recording: list[dict],
+    db: ActDb,
+    backend: StubBackend,
+    speed: float = 1.0,
+    requests_per_minute: int = 30,
+    tokens_per_minute: int = 15000,
+) -> ReplayStats:
+    """Replay given recording through AI cog of a disconnected bot. Get stats."""
+    stats = ReplayStats()
+    bot = ActBot(
+        command_prefix="!", intents=Intents.none(), db=db, api_keys={"gemini": "stub"}
+    )
+    bot._connection.user = ClientUser(
+        state=bot._connection,
+        data={"id": 1, "username": "activa", "discriminator": "0", "avatar": None},  # type: ignore
+    )
+    cog = AiCog(bot)
+    cog.ai = ActAi(
+        api_key="stub",
+        instructions=cog.persona.description,
+        backend=backend,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+    )
+    cog.REPLY_DELAY_RANGE = (0, 0)
+    cog.AUTO_REPLY_ENABLED = False
+    await cog.cog_load()
+
+    # Time prompt building
+    create_prompt = cog.create_prompt
+
+    async def timed_create_prompt(*args, **kwargs):
+        start_time = monotonic()
+        result = await create_prompt(*args, **kwargs)
+        stats.prompt_build_times.append(monotonic() - start_time)
+        return result
+
+    cog.create_prompt = timed_create_prompt  # type: ignore
+
+    guilds: dict[int, ReplayGuild] = {}
+    channels: dict[int, ReplayChannel] = {}
+    authors: dict[int, ReplayUser] = {}
+    messages: list[ReplayMessage] = []
+    start_time = monotonic()
+    for event in recording:
+        if (delay := event["at"] / speed - (monotonic() - start_time)) > 0:
+            await asyncio.sleep(delay)
+        guild_id = event.get("guild_id")
+        guild = guilds.setdefault(guild_id, ReplayGuild(guild_id)) if guild_id else None
+        channel = channels.setdefault(
+            event["channel_id"], ReplayChannel(event["channel_id"], guild)
+        )
+        author = authors.setdefault(
+            event["author_id"], ReplayUser(event["author_id"], event["author_name"])
+        )
+        mentions = [bot.user] if event.get("mentions_bot") else []
+        content = f"{bot.user.mention} {event["content"]}" if mentions else event["content"]  # type: ignore
+        message = ReplayMessage(content, author, channel, mentions, stats)
+        messages.append(message)
+        stats.messages_count += 1
+        stats.mentions_count += bool(mentions)
+        await cog.on_message(message)  # type: ignore
+        stats.max_queue_depth = max(stats.max_queue_depth, cog.ai.limiter.queue_depth)
+
+    # Wait for pending replies
+    while any(
+        cog.task_manager.is_running(f"reply_{message.id}") for message in messages
+    ):
+        stats.max_queue_depth = max(stats.max_queue_depth, cog.ai.limiter.queue_depth)
+        await asyncio.sleep(0.05)
+    elapsed_time = monotonic() - start_time
+    await cog.cog_unload()
+    log.info(stats.report(elapsed_time, backend))
+    return stats
+
+
+async def main():
+    parser = ArgumentParser(description="Replay Discord messages through AI cog.")
+    parser.add_argument("recording", nargs="?", help="JSONL recording file path")
+    parser.add_argument(
+        "--messages",
+        type=int,
+        default=500,
+        help="generated messages count (if no recording)",
+    )
+    parser.add_argument("--speed", type=float, default=10.0, help="replay speed factor")
+    parser.add_argument(
+        "--db-uri", help="MongoDB server uri (if none, databases kept in memory)"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="stub model latency (sec)"
+    )
+    parser.add_argument(
+        "--failure-rate", type=float, default=0.0, help="stub model failure chance"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=30, help="model requests per minute quota"
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=15000, help="model tokens per minute quota"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    recording = (
+        load_recording(args.recording)
+        if args.recording
+        else generate_recording(args.messages, seed=args.seed)
+    )
+    backend = StubBackend(
+        latency=args.latency, failure_rate=args.failure_rate, seed=args.seed
+    )
+    if not args.db_uri:
+        if not AioMemoryClient:
+            log.error("In-memory databases need mongomock-motor, or give a db uri.")
+            return
+        with memory_db_clients():
+            db = ActDb(name="ACT_replay", models=[Actor])
+            await replay(recording, db, backend, args.speed, args.rpm, args.tpm)
+        return
+    try:
+        db = ActDb(
+            host=args.db_uri,
+            name="ACT_replay",
+            models=[Actor],
+            serverSelectionTimeoutMS=DB_TIMEOUT,
+        )
+    except ServerSelectionTimeoutError:
+        log.warning(f"No MongoDB reachable at {args.db_uri}, replay skipped.")
+        return
+    try:
+        await replay(recording, db, backend, args.speed, args.rpm, args.tpm)
+    finally:
+        for db_name in [db.name, *db.db_names.values()]:
+            db._client.drop_database(db_name)
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())